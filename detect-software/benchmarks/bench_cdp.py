@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+CDP Microbenchmarks - Hot paths of ChromeDevToolsClient in isolation
+
+Times JSON encoding/decoding of CDP messages, the event pre-filter that
+drops unsubscribed events without decoding them, _send_command round trips,
+execute_javascript result unwrapping and page-helper calls carrying short and
+10KB prompts, against the in-process fake_cdp.FakeChrome server. Results are
+emitted as JSON so runs before and after a change can be diffed directly.
+
+Usage:
+    python benchmarks/bench_cdp.py
+    python benchmarks/bench_cdp.py --iterations 5000 --json before.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from fake_cdp import FakeChrome  # noqa: E402
+from metrics import Histogram  # noqa: E402
+from page_runtime import CALL_HELPER  # noqa: E402
+from react_input_handler import PROMPT_TEXTAREA_SELECTOR  # noqa: E402
+from whisk_session_takeover import EVENT_METHOD, ChromeDevToolsClient  # noqa: E402
+
+
+SHORT_PROMPT = "A watercolor fox in a misty forest at dawn"
+LONG_PROMPT = ("A watercolor fox in a misty forest at dawn, soft light, " * 200)[:10 * 1024]
+
+
+def result(histogram: Histogram, extra: Dict[str, Any] = None) -> Dict[str, Any]:
+    mean = histogram.total / histogram.count
+    data = {
+        'iterations': histogram.count,
+        'ops_per_sec': round(1 / mean, 1) if mean else None,
+        'mean_us': round(mean * 1e6, 2),
+        'p50_us': round(histogram.percentile(0.5) * 1e6, 2),
+        'p99_us': round(histogram.percentile(0.99) * 1e6, 2),
+    }
+    data.update(extra or {})
+    return data
+
+
+def bench_sync(func: Callable[[], Any], iterations: int, **extra) -> Dict[str, Any]:
+    for _ in range(min(100, iterations)):
+        func()
+    histogram = Histogram()
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        histogram.record(time.perf_counter() - started)
+    return result(histogram, extra)
+
+
+async def bench_async(func: Callable[[], Awaitable[Any]], iterations: int, **extra) -> Dict[str, Any]:
+    for _ in range(min(50, iterations)):
+        await func()
+    histogram = Histogram()
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await func()
+        histogram.record(time.perf_counter() - started)
+    return result(histogram, extra)
+
+
+def helper_message(prompt: str) -> Dict[str, Any]:
+    """The Runtime.callFunctionOn message PageRuntime sends for helpers.call('fill', ...)"""
+    return {
+        'id': 123456,
+        'method': 'Runtime.callFunctionOn',
+        'params': {
+            'functionDeclaration': CALL_HELPER,
+            'objectId': '-1234567890.1.1',
+            'arguments': [{'value': 'fill'}, {'objectId': '-1234567890.1.2'}, {'value': prompt}],
+            'returnByValue': True,
+            'awaitPromise': True,
+        },
+    }
+
+
+def evaluate_response(value: Any) -> Dict[str, Any]:
+    return {'id': 123456, 'result': {'result': {'type': 'object', 'value': value}}}
+
+
+async def run(iterations: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+
+    # Message encoding and decoding, no I/O
+    for label, prompt in (('short', SHORT_PROMPT), ('10kb', LONG_PROMPT)):
+        message = helper_message(prompt)
+        encoded = json.dumps(message)
+        results[f'json_encode_helper_call_{label}'] = bench_sync(
+            lambda: json.dumps(message), iterations, bytes=len(encoded))
+        results[f'json_decode_helper_call_{label}'] = bench_sync(
+            lambda: json.loads(encoded), iterations, bytes=len(encoded))
+
+    snapshot = {'found': True, 'disabled': False, 'clickable': True, 'opacity': '1',
+                'textareaLength': len(LONG_PROMPT), 'textareaValue': LONG_PROMPT[:50] + '...'}
+    for label, value in (('bool', True), ('snapshot', snapshot), ('10kb', LONG_PROMPT)):
+        raw = json.dumps(evaluate_response(value))
+        results[f'json_decode_evaluate_result_{label}'] = bench_sync(
+            lambda: json.loads(raw), iterations, bytes=len(raw))
+
+    # An unsubscribed DOM mutation event: full decode vs. reading only the method name
+    dom_event = json.dumps({'method': 'DOM.childNodeInserted', 'params': {
+        'parentNodeId': 42, 'previousNodeId': 41,
+        'node': {'nodeId': 43, 'nodeName': 'IMG', 'attributes': ['src', 'blob:' + 'x' * 64] * 4, 'childNodeCount': 0},
+    }})
+    results['event_decode_unsubscribed'] = bench_sync(
+        lambda: json.loads(dom_event), iterations, bytes=len(dom_event))
+    results['event_prefilter_unsubscribed'] = bench_sync(
+        lambda: EVENT_METHOD.match(dom_event).group(1), iterations, bytes=len(dom_event))
+
+    # Round trips through the websocket to the in-process fake
+    fake = FakeChrome()
+    await fake.start()
+    client = ChromeDevToolsClient(fake.http_port)
+    try:
+        if not await client.connect():
+            raise RuntimeError("Could not connect to the fake CDP server")
+
+        results['send_command_round_trip'] = await bench_async(
+            lambda: client._send_command("Runtime.enable"), iterations)
+        results['send_command_concurrent_x10'] = await bench_async(
+            lambda: asyncio.gather(*(client._send_command("Runtime.enable") for _ in range(10))),
+            max(1, iterations // 10), commands_per_iteration=10)
+        results['execute_javascript_unwrap'] = await bench_async(
+            lambda: client.execute_javascript("1 + 1"), iterations)
+        results['wait_for_element_immediate'] = await bench_async(
+            lambda: client.wait_for_element(PROMPT_TEXTAREA_SELECTOR, timeout=1), iterations)
+
+        element = client.helpers.element(PROMPT_TEXTAREA_SELECTOR)
+        for label, prompt in (('short', SHORT_PROMPT), ('10kb', LONG_PROMPT)):
+            results[f'helper_fill_{label}'] = await bench_async(
+                lambda: client.helpers.call('fill', element, prompt), iterations, prompt_chars=len(prompt))
+    finally:
+        await client.close()
+        await fake.stop()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the CDP client")
+    parser.add_argument("--iterations", type=int, default=2000, help="Iterations per benchmark")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.time(),
+        'results': asyncio.run(run(args.iterations)),
+    }
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+E2E Benchmark - Drive WhiskAutomator against a local mock of Whisk
+
+Runs a batch of synthetic prompts through WhiskAutomator, ChromeDevToolsClient
+and ReactInputHandler without a Google session. Two backends:
+
+  scripted  fake_cdp.FakeChrome answers CDP directly (no browser, default)
+  chromium  headless Chromium loads mock_whisk.html from a local HTTP server
+
+Both simulate generation latency, jitter and a failure (quota) rate. The
+report gives prompts per hour, p50/p99 per stage and CDP commands per prompt.
+
+Usage:
+    python benchmarks/bench_e2e.py --prompts 50 --latency 1.5
+    python benchmarks/bench_e2e.py --backend chromium --workers 2 --json results.json
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+import requests
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from fake_cdp import FakeChrome  # noqa: E402
+from metrics import METRICS  # noqa: E402
+from whisk_session_takeover import WhiskAutomator, WhiskConfig  # noqa: E402
+
+
+CHROMIUM_NAMES = ["chromium", "chromium-browser", "google-chrome", "google-chrome-stable", "chrome"]
+CHROMIUM_PATHS = [
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+]
+
+
+def find_chromium(explicit: str = None) -> Optional[str]:
+    """Chromium/Chrome executable from --chrome, $CHROME_PATH, PATH or the usual install paths"""
+    for candidate in [explicit, os.environ.get("CHROME_PATH")]:
+        if candidate and Path(candidate).exists():
+            return candidate
+    for name in CHROMIUM_NAMES:
+        found = shutil.which(name)
+        if found:
+            return found
+    return next((path for path in CHROMIUM_PATHS if Path(path).exists()), None)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class MockSite:
+    """Serves the benchmarks directory (mock_whisk.html) on an ephemeral port"""
+
+    def __init__(self):
+        class QuietHandler(SimpleHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+        handler = functools.partial(QuietHandler, directory=str(BENCH_DIR))
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, **params) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/mock_whisk.html?{urlencode(params)}"
+
+    def close(self):
+        self.server.shutdown()
+
+
+async def launch_chromium(binary: str, url: str, port: int, profile: str) -> subprocess.Popen:
+    """Start headless Chromium on url and wait until its debug endpoint answers"""
+    process = subprocess.Popen([
+        binary, "--headless=new", f"--remote-debugging-port={port}", f"--user-data-dir={profile}",
+        "--no-first-run", "--no-default-browser-check", "--disable-gpu", url
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Chromium exited with code {process.returncode}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/json/version", timeout=1)
+            return process
+        except requests.RequestException:
+            await asyncio.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Chromium debug port did not come up")
+
+
+def summarize(automator: WhiskAutomator, total: int, backend: Dict[str, Any]) -> Dict[str, Any]:
+    """Throughput from the journal timings, latencies and CDP counts from METRICS"""
+    entries = [entry for entry in automator.journal.entries.values() if 'finished_at' in entry]
+    succeeded = sum(1 for entry in entries if entry['status'] == 'done')
+    wall = (max(e['finished_at'] for e in entries) - min(e['started_at'] for e in entries)) if entries else 0.0
+    snapshot = METRICS.snapshot()
+
+    def latency(name: str, key: str = None) -> Dict[str, Any]:
+        series = snapshot['histograms'].get(name, [])
+        return {
+            (entry['labels'].get(key) if key else 'all'): {
+                'count': entry['count'], 'p50': entry['p50'], 'p99': entry['p99'], 'max': entry['max']
+            }
+            for entry in series
+        }
+
+    commands = {
+        entry['labels']['method']: entry['count']
+        for entry in snapshot['histograms'].get('cdp_command_seconds', [])
+    }
+    total_commands = sum(commands.values())
+    return {
+        'backend': backend,
+        'prompts': total,
+        'succeeded': succeeded,
+        'failed': len(entries) - succeeded,
+        'wall_seconds': round(wall, 3),
+        'prompts_per_hour': round(succeeded / wall * 3600, 1) if wall else None,
+        'prompt_seconds': latency('prompt_seconds').get('all'),
+        'stages': latency('prompt_stage_seconds', 'stage'),
+        # Includes the per-tab connection setup, amortised over the batch
+        'cdp_commands_per_prompt': round(total_commands / total, 2) if total else None,
+        'cdp_commands_by_method': commands,
+        'cdp_command_seconds': latency('cdp_command_seconds', 'method'),
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\nBackend: {report['backend']}")
+    print(f"Prompts: {report['succeeded']}/{report['prompts']} succeeded in {report['wall_seconds']:.1f}s "
+          f"-> {report['prompts_per_hour'] or 0:.0f} prompts/h")
+    print(f"CDP commands per prompt: {report['cdp_commands_per_prompt']}")
+    print(f"\n{'stage':<14}{'count':>8}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    rows = dict(report['stages'])
+    if report['prompt_seconds']:
+        rows['prompt (total)'] = report['prompt_seconds']
+    for stage, stats in rows.items():
+        print(f"{stage:<14}{stats['count']:>8}{stats['p50'] * 1000:>12.1f}{stats['p99'] * 1000:>12.1f}")
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    METRICS.reset()
+    workdir = tempfile.mkdtemp(prefix="whisk-bench-")
+    site = fake = chromium = None
+    page = {'latency': args.latency, 'jitter': args.jitter, 'failure_rate': args.failure_rate}
+
+    try:
+        if args.backend == "chromium":
+            binary = find_chromium(args.chrome)
+            if not binary:
+                raise RuntimeError("No Chromium/Chrome executable found (use --chrome or $CHROME_PATH)")
+            site = MockSite()
+            url = site.url(**page)
+            port = free_port()
+            chromium = await launch_chromium(binary, url, port, os.path.join(workdir, "profile"))
+            backend = {'name': 'chromium', 'binary': binary, **page}
+        else:
+            fake = FakeChrome(args.latency, args.jitter, args.failure_rate, rtt=args.rtt)
+            await fake.start()
+            url, port = fake.url, fake.http_port
+            backend = {'name': 'scripted', 'rtt': args.rtt, **page}
+
+        config = WhiskConfig(
+            chrome_debug_port=port,
+            generation_delay=max(10, int(args.latency * 3 + args.jitter)),
+            retry_attempts=args.retries,
+            retry_delay=0.5,
+            workers=args.workers,
+            whisk_url=url,
+            input_mode=args.input_mode,
+            click_strategy_file=os.path.join(workdir, "click_strategy.json"),
+            journal_file=os.path.join(workdir, "journal.jsonl"),
+            between_prompts_delay=args.gap,
+            adaptive_pacing=args.adaptive,
+        )
+        prompts = [
+            f"Benchmark prompt {i}: " + "a watercolor fox in a misty forest, " * max(1, args.prompt_length // 36)
+            for i in range(args.prompts)
+        ]
+        automator = WhiskAutomator(config, prompts)
+        await automator.run()
+        return summarize(automator, args.prompts, backend)
+    finally:
+        if fake:
+            await fake.stop()
+        if chromium:
+            chromium.terminate()
+            chromium.wait(timeout=10)
+        if site:
+            site.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark against a local mock of Whisk")
+    parser.add_argument("--backend", choices=["scripted", "chromium"], default="scripted")
+    parser.add_argument("--chrome", help="Chromium/Chrome executable for the chromium backend")
+    parser.add_argument("--prompts", type=int, default=20, help="Number of prompts in the batch")
+    parser.add_argument("--prompt-length", type=int, default=200, help="Approximate prompt length in characters")
+    parser.add_argument("--workers", type=int, default=1, help="Tabs processing prompts in parallel")
+    parser.add_argument("--latency", type=float, default=1.0, help="Simulated generation latency (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter on the latency (seconds)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of generations that fail")
+    parser.add_argument("--rtt", type=float, default=0.0, help="Scripted backend: delay per CDP reply (seconds)")
+    parser.add_argument("--retries", type=int, default=3, help="Retry attempts per prompt")
+    parser.add_argument("--gap", type=float, default=0.0, help="Initial gap between prompt submissions (seconds)")
+    parser.add_argument("--adaptive", action="store_true", help="Let the pacer adapt the gap (off for stable numbers)")
+    parser.add_argument("--input-mode", choices=["react", "native"], default="react")
+    parser.add_argument("--json", help="Write the report as JSON to this file ('-' for stdout)")
+    parser.add_argument("--verbose", action="store_true", help="Show the automator's log output")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    report = asyncio.run(run_benchmark(args))
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Fake CDP - Scripted Chrome DevTools stand-in for benchmarks
+
+Serves the /json discovery endpoints over HTTP and one websocket per fake
+tab. Each tab answers the calls WhiskAutomator makes (helper calls by name,
+in-page waits, Input.insertText) from a tiny model of the mock Whisk page and
+reports finished generations through Runtime.bindingCalled, with the same
+configurable latency and failure rate as mock_whisk.html. No browser needed.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import websockets
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from page_runtime import CALL_HELPER, QUERY_SELECTOR  # noqa: E402
+
+
+class FakeTab:
+    """State of one fake Whisk tab and the replies to its CDP commands"""
+
+    def __init__(self, server: "FakeChrome", target_id: str):
+        self.server = server
+        self.target_id = target_id
+        self.value = ""
+        self.generating = False
+        self.watch: Optional[Dict[str, Any]] = None
+        self.last_report: Optional[str] = None
+        self.websocket = None
+        self._nodes = itertools.count(1)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'id': self.target_id,
+            'type': 'page',
+            'title': 'Whisk (mock)',
+            'url': self.server.url,
+            'webSocketDebuggerUrl': f"ws://127.0.0.1:{self.server.ws_port}/devtools/page/{self.target_id}",
+        }
+
+    async def handle(self, message: Dict[str, Any]):
+        if self.server.rtt:
+            await asyncio.sleep(self.server.rtt)
+        try:
+            result = self.reply(message['method'], message.get('params') or {})
+            response = {'id': message['id'], 'result': result}
+        except Exception as e:
+            response = {'id': message['id'], 'error': {'message': str(e)}}
+        await self.send(response)
+
+    async def send(self, message: Dict[str, Any]):
+        self.server.messages_out += 1
+        await self.websocket.send(json.dumps(message))
+
+    def reply(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if method == 'Page.addScriptToEvaluateOnNewDocument':
+            return {'identifier': '1'}
+        if method == 'Runtime.evaluate':
+            return self._evaluate(params['expression'])
+        if method == 'Runtime.callFunctionOn':
+            return self._call_function(params)
+        if method == 'Input.insertText':
+            self.value = params['text']
+            return {}
+        # Runtime.enable, DOM.enable, Runtime.addBinding, ...
+        return {}
+
+    def _evaluate(self, expression: str) -> Dict[str, Any]:
+        if expression.rstrip().endswith('window.__whiskHelpers'):
+            return {'result': {'type': 'object', 'objectId': 'helpers'}}
+        # wait_for_element and other presence checks
+        return {'result': {'type': 'object', 'value': True}}
+
+    def _call_function(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        declaration = params['functionDeclaration']
+        args = [arg.get('value') for arg in params.get('arguments', [])]
+        if declaration == QUERY_SELECTOR:
+            return {'result': {'type': 'object', 'objectId': f"node-{next(self._nodes)}"}}
+        if declaration != CALL_HELPER:
+            raise ValueError("Unexpected function declaration")
+        return {'result': {'type': 'object', 'value': self._helper(args[0], args[1:])}}
+
+    def _enabled(self) -> bool:
+        return bool(self.value.strip()) and not self.generating
+
+    def _helper(self, name: str, args: list) -> Any:
+        if name == 'fill':
+            self.value = args[1]
+            return {'success': True, 'length': len(self.value)}
+        if name == 'focusForInput':
+            return True
+        if name == 'snapshot':
+            return {'found': True, 'disabled': not self._enabled(), 'clickable': self._enabled()}
+        if name in ('click', 'forceClick'):
+            started = self._submit(force=name == 'forceClick')
+            return {'success': started, 'method': args[1]} if name == 'forceClick' else started
+        if name == 'buttonReady':
+            return {'clickable': True, 'opacity': '1'} if self._enabled() else None
+        if name == 'generationStarted':
+            return {'hasLoading': True} if self.generating else None
+        if name == 'until':
+            # Answered at once: the model only changes between commands
+            return self._helper(args[0], args[2:])
+        if name == 'lastGeneration':
+            return self.last_report
+        if name == 'watchGeneration':
+            token, _, _, binding = args
+            self.watch = {'token': token, 'binding': binding}
+            return 0
+        raise ValueError(f"Unknown helper {name}")
+
+    def _submit(self, force: bool = False) -> bool:
+        if self.generating or not (self.value.strip() or force):
+            return False
+        self.generating = True
+        self.value = ""
+        asyncio.get_running_loop().create_task(self._generate())
+        return True
+
+    async def _generate(self):
+        server = self.server
+        delay = max(0.0, server.latency + random.uniform(-server.jitter, server.jitter))
+        await asyncio.sleep(delay)
+        self.generating = False
+
+        failed = random.random() < server.failure_rate
+        watch, self.watch = self.watch, None
+        if watch is None:
+            return
+        self.last_report = json.dumps({
+            'token': watch['token'],
+            'status': 'no_output' if failed else 'done',
+            'alert': 'Quota exceeded, please try again later' if failed else '',
+            'outputs': 0 if failed else 2,
+            'elapsed': delay,
+        })
+        try:
+            await self.send({
+                'method': 'Runtime.bindingCalled',
+                'params': {'name': watch['binding'], 'payload': self.last_report},
+            })
+        except websockets.ConnectionClosed:
+            # Nobody attached; the client collects last_report after reconnecting
+            pass
+
+
+class FakeChrome:
+    """HTTP discovery endpoint plus websocket tabs, all on 127.0.0.1"""
+
+    def __init__(self, latency: float = 2.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 rtt: float = 0.0, url: str = "http://127.0.0.1/mock_whisk.html"):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rtt = rtt
+        self.url = url
+        self.tabs: Dict[str, FakeTab] = {}
+        self.messages_in = 0
+        self.messages_out = 0
+        self.http_port = 0
+        self.ws_port = 0
+        self._ids = itertools.count(1)
+        self._ws_server = None
+        self._http_server: Optional[ThreadingHTTPServer] = None
+        self.new_tab()
+
+    def new_tab(self) -> FakeTab:
+        tab = FakeTab(self, f"FAKE{next(self._ids)}")
+        self.tabs[tab.target_id] = tab
+        return tab
+
+    async def start(self):
+        self._ws_server = await websockets.serve(self._serve_tab, '127.0.0.1', 0, max_size=None)
+        self.ws_port = next(iter(self._ws_server.sockets)).getsockname()[1]
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _json(self, data):
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith('/json/version'):
+                    self._json({
+                        'Browser': 'FakeChrome/1.0',
+                        'Protocol-Version': '1.3',
+                        'webSocketDebuggerUrl': f"ws://127.0.0.1:{server.ws_port}/devtools/browser/fake",
+                    })
+                elif self.path.startswith('/json'):
+                    self._json([tab.describe() for tab in server.tabs.values()])
+                else:
+                    self.send_error(404)
+
+            def do_PUT(self):
+                if self.path.startswith('/json/new'):
+                    self._json(server.new_tab().describe())
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._http_server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.http_port = self._http_server.server_address[1]
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+
+    async def _serve_tab(self, websocket, path: str = None):
+        # websockets < 14 passes the path (or sets .path); newer versions expose .request
+        path = path or getattr(websocket, 'path', None) or websocket.request.path
+        if '/devtools/browser/' in path:
+            await self._serve_browser(websocket)
+            return
+        tab = self.tabs.get(path.rsplit('/', 1)[-1])
+        if tab is None:
+            await websocket.close()
+            return
+        tab.websocket = websocket
+        tasks = set()
+        try:
+            async for raw in websocket:
+                self.messages_in += 1
+                task = asyncio.create_task(tab.handle(json.loads(raw)))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _serve_browser(self, websocket):
+        """Browser endpoint: target discovery and creation"""
+        async for raw in websocket:
+            self.messages_in += 1
+            message = json.loads(raw)
+            if message['method'] == 'Target.getTargets':
+                result = {'targetInfos': [
+                    {'targetId': tab.target_id, 'type': 'page', 'title': 'Whisk (mock)', 'url': self.url}
+                    for tab in self.tabs.values()
+                ]}
+            elif message['method'] == 'Target.createTarget':
+                result = {'targetId': self.new_tab().target_id}
+            else:
+                result = {}
+            self.messages_out += 1
+            await websocket.send(json.dumps({'id': message['id'], 'result': result}))
+
+    async def drop_connections(self):
+        """Close every tab websocket, as if the connection to Chrome was lost"""
+        for tab in self.tabs.values():
+            if tab.websocket:
+                await tab.websocket.close()
+
+    async def stop(self):
+        if self._ws_server:
+            self._ws_server.close()
+            await self._ws_server.wait_closed()
+        if self._http_server:
+            self._http_server.shutdown()
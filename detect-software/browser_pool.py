@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Browser Pool - Launch and supervise debug-enabled Chrome instances
+
+Each instance gets its own remote-debugging port and a persistent profile
+from the ProfileStore (one per account, or per port when no account is
+named), so logins and caches survive restarts. Readiness is detected by
+polling /json/version instead of sleeping, and a supervisor restarts any
+browser that exits while the pool is running and tells the on_restart()
+hooks, so the tabs that lived in it can be opened again.
+"""
+
+import asyncio
+import logging
+import os
+import platform
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+import requests
+
+from metrics import METRICS
+from profile_store import POOL_PREFIX, ProfileStore
+
+
+WHISK_URL = "https://labs.google/fx/tools/whisk"
+
+
+def find_chrome(explicit: str = None) -> Optional[str]:
+    """Chrome/Chromium executable: explicit path, $CHROME_PATH, the usual install paths, then PATH"""
+    candidates = [explicit, os.environ.get("CHROME_PATH")]
+    system = platform.system()
+    if system == "Windows":
+        candidates += [
+            "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+            "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe",
+            os.path.expanduser("~\\AppData\\Local\\Google\\Chrome\\Application\\chrome.exe"),
+        ]
+    elif system == "Darwin":
+        candidates += ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"]
+    else:
+        candidates += ["/usr/bin/google-chrome", "/usr/bin/google-chrome-stable", "/usr/bin/chromium-browser"]
+
+    for candidate in candidates:
+        if candidate and os.path.exists(candidate):
+            return candidate
+    for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"):
+        found = shutil.which(name)
+        if found:
+            return found
+    return None
+
+
+def devtools_ready(port: int, timeout: float = 1.0) -> bool:
+    """Whether something answers /json/version on the debug port"""
+    try:
+        return requests.get(f"http://localhost:{port}/json/version", timeout=timeout).ok
+    except requests.RequestException:
+        return False
+
+
+class BrowserInstance:
+    """One Chrome process on a fixed debug port with a persistent profile"""
+
+    def __init__(self, port: int, profile_dir: Path, chrome_path: str = None,
+                 url: str = WHISK_URL, extra_args: List[str] = None):
+        self.port = port
+        self.profile_dir = Path(profile_dir)
+        self.chrome_path = chrome_path
+        self.url = url
+        self.extra_args = extra_args or []
+        self.process: Optional[subprocess.Popen] = None
+        self.adopted = False
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def running(self) -> bool:
+        if self.adopted:
+            return True
+        return self.process is not None and self.process.poll() is None
+
+    async def start(self, timeout: float = 30) -> bool:
+        """Launch Chrome (or adopt one already on the port) and wait until DevTools answers"""
+        if await asyncio.to_thread(devtools_ready, self.port):
+            self.adopted = True
+            self.logger.info(f"Chrome already running on port {self.port}, using it")
+            return True
+
+        chrome_path = self.chrome_path or find_chrome()
+        if not chrome_path:
+            self.logger.error("Chrome executable not found")
+            return False
+
+        cmd = [
+            chrome_path,
+            f"--remote-debugging-port={self.port}",
+            f"--user-data-dir={self.profile_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            *self.extra_args,
+        ]
+        if self.url:
+            cmd.append(self.url)
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return await self.wait_ready(timeout)
+
+    async def wait_ready(self, timeout: float = 30) -> bool:
+        """Poll /json/version until Chrome answers, the process exits or the timeout expires"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = 0.1
+        while loop.time() < deadline:
+            if self.process and self.process.poll() is not None:
+                self.logger.error(f"Chrome on port {self.port} exited with code {self.process.returncode}")
+                return False
+            if await asyncio.to_thread(devtools_ready, self.port):
+                self.logger.info(f"Chrome ready on port {self.port} (profile {self.profile_dir})")
+                return True
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.5, 1.0)
+        self.logger.error(f"Chrome on port {self.port} not ready after {timeout}s")
+        return False
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+class BrowserPool:
+    """A fleet of Chrome instances on consecutive debug ports
+
+    profiles names the account profile for each browser in order; browsers
+    beyond the list use a per-port profile.
+    """
+
+    def __init__(self, size: int = 1, base_port: int = 9222, profiles: List[str] = None,
+                 store: ProfileStore = None, chrome_path: str = None, url: str = WHISK_URL,
+                 extra_args: List[str] = None):
+        profiles = list(profiles or [])
+        size = max(1, size, len(profiles))
+        self.store = store or ProfileStore()
+        self.profile_names = [
+            profiles[i] if i < len(profiles) else f"{POOL_PREFIX}{base_port + i}" for i in range(size)
+        ]
+        self.instances = [
+            BrowserInstance(base_port + i, self.store.acquire(name), chrome_path, url, extra_args)
+            for i, name in enumerate(self.profile_names)
+        ]
+        self.logger = logging.getLogger(__name__)
+        self._supervisor: Optional[asyncio.Task] = None
+        self._gc: Optional[asyncio.Task] = None
+        self._restart_hooks: List[Callable[[int], Any]] = []
+
+    @property
+    def ports(self) -> List[int]:
+        return [instance.port for instance in self.instances]
+
+    async def start(self, timeout: float = 30, supervise: bool = True) -> bool:
+        """Start every instance concurrently, then sweep old profiles in the background; True once all are ready"""
+        results = await asyncio.gather(*(instance.start(timeout) for instance in self.instances))
+        if self._gc is None:
+            self._gc = asyncio.create_task(asyncio.to_thread(self.store.collect_garbage, self.profile_names))
+        if supervise and all(results) and self._supervisor is None:
+            self._supervisor = asyncio.create_task(self._supervise())
+        return all(results)
+
+    def on_restart(self, hook: Callable[[int], Any]):
+        """Run hook(port) (sync or async) after the supervisor restarted a browser"""
+        self._restart_hooks.append(hook)
+
+    async def _supervise(self, interval: float = 5.0):
+        """Restart browsers we launched if they exit"""
+        while True:
+            await asyncio.sleep(interval)
+            for instance in self.instances:
+                if instance.running:
+                    continue
+                self.logger.warning(f"Chrome on port {instance.port} exited, restarting")
+                METRICS.inc("browser_restarts", port=instance.port)
+                if not await instance.start():
+                    continue
+                # Pages of the old process are gone; whoever used them has to reopen them
+                for hook in list(self._restart_hooks):
+                    try:
+                        result = hook(instance.port)
+                        if asyncio.iscoroutine(result):
+                            await result
+                    except Exception as e:
+                        self.logger.error(f"Restart hook for port {instance.port} failed: {e}")
+
+    async def stop(self, close_browsers: bool = False):
+        """Stop supervising; optionally terminate the browsers we launched"""
+        if self._supervisor:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
+        if close_browsers:
+            for instance in self.instances:
+                instance.stop()
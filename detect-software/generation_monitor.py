@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Generation Monitor - Page-pushed detection of finished Whisk generations
+"""
+
+import asyncio
+import itertools
+import json
+import re
+from typing import Any, Dict, Optional
+
+
+BINDING_NAME = "__whiskGenerationDone"
+
+# Alert text that means Whisk is rate-limiting us rather than failing one prompt
+QUOTA_PATTERN = re.compile(r"quota|limit|too many|try again later|unusual activity", re.IGNORECASE)
+
+
+class GenerationMonitor:
+    """Signals from the page when a Whisk generation has produced its outputs"""
+
+    def __init__(self, chrome_client, logger, loading_selector: str, result_selector: str):
+        self.chrome_client = chrome_client
+        self.logger = logger
+        self.loading_selector = loading_selector
+        self.result_selector = result_selector
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._tokens = itertools.count(1)
+        self._installed = False
+
+    async def install(self):
+        """Register the page binding the observer reports through"""
+        if self._installed:
+            return
+        self.chrome_client.on("Runtime.bindingCalled", self._on_binding_called)
+        # Bindings belong to the DevTools session, so add it again after a reconnect
+        self.chrome_client.on_reconnect(self._add_binding)
+        await self._add_binding()
+        self._installed = True
+
+    async def _add_binding(self):
+        await self.chrome_client._send_command("Runtime.addBinding", {"name": BINDING_NAME})
+        if self._waiters:
+            # A generation may have finished while the connection was down
+            report = await self.chrome_client.helpers.call('lastGeneration')
+            if report:
+                self._on_binding_called({"name": BINDING_NAME, "payload": report})
+
+    def _on_binding_called(self, params: Dict[str, Any]):
+        """Resolve the waiter a page notification belongs to"""
+        if params.get("name") != BINDING_NAME:
+            return
+        try:
+            payload = json.loads(params.get("payload") or "{}")
+        except ValueError:
+            return
+        future = self._waiters.get(payload.get("token"))
+        if future and not future.done():
+            future.set_result(payload)
+
+    async def arm(self) -> str:
+        """Snapshot the current outputs and start watching for new ones
+
+        Call this before clicking submit; the returned token is passed to wait().
+        """
+        await self.install()
+        token = f"gen-{next(self._tokens)}"
+        self._waiters[token] = asyncio.get_running_loop().create_future()
+
+        baseline = await self.chrome_client.helpers.call(
+            'watchGeneration', token, self.loading_selector, self.result_selector, BINDING_NAME
+        )
+        self.logger.debug(f"Generation monitor armed ({token}, {baseline} existing outputs)")
+        return token
+
+    async def wait(self, token: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait for the page to report the armed generation; None on timeout"""
+        future = self._waiters.get(token)
+        if future is None:
+            return None
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._waiters.pop(token, None)
+
+    def reported(self, token: str) -> bool:
+        """Whether the page already reported the armed generation (e.g. during a reconnect)"""
+        future = self._waiters.get(token)
+        return bool(future and future.done() and not future.cancelled())
+
+    @staticmethod
+    def is_quota_signal(outcome: Optional[Dict[str, Any]]) -> bool:
+        """Whether a reported outcome carries a quota / rate-limit message"""
+        return bool(outcome and QUOTA_PATTERN.search(outcome.get('alert') or ''))
+
+    def cancel(self, token: str):
+        """Forget an armed generation that will not be waited on"""
+        future = self._waiters.pop(token, None)
+        if future and not future.done():
+            future.cancel()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Lean Mode - Keep the Whisk renderer free of work automation never needs
+
+Requests of the configured resource classes are failed through the Fetch
+domain: analytics beacons before they are sent, fonts/media/images once their
+headers arrive so the Content-Length of the body we skipped can be counted.
+CSS animations and transitions are collapsed by an injected stylesheet and
+prefers-reduced-motion is emulated, so the page stops repainting for effects.
+"""
+
+import fnmatch
+import logging
+from typing import Any, Dict, List
+
+from metrics import METRICS
+
+
+# Fetch.RequestPattern lists per resource class
+RESOURCE_CLASSES: Dict[str, List[Dict[str, Any]]] = {
+    "analytics": [
+        {"urlPattern": pattern, "requestStage": "Request"} for pattern in (
+            "*://www.google-analytics.com/*",
+            "*://www.googletagmanager.com/*",
+            "*://*.doubleclick.net/*",
+            "*://play.google.com/log*",
+            "*/gen_204*",
+        )
+    ],
+    "fonts": [{"resourceType": "Font", "requestStage": "Response"}],
+    "media": [{"resourceType": "Media", "requestStage": "Response"}],
+    # Generated results are blob:/data: images, which Fetch never sees, but icons may break
+    "images": [{"resourceType": "Image", "requestStage": "Response"}],
+}
+DEFAULT_LEAN_BLOCK = ["analytics", "fonts", "media"]
+
+NO_ANIMATION_SOURCE = r"""
+(() => {
+    const install = () => {
+        if (document.getElementById('__whiskLeanStyle')) return;
+        const style = document.createElement('style');
+        style.id = '__whiskLeanStyle';
+        // Near-zero rather than none, so animationend/transitionend still fire
+        style.textContent = `*, *::before, *::after {
+            animation-duration: 0.01ms !important;
+            animation-delay: 0s !important;
+            animation-iteration-count: 1 !important;
+            transition-duration: 0.01ms !important;
+            transition-delay: 0s !important;
+            scroll-behavior: auto !important;
+        }`;
+        (document.head || document.documentElement).appendChild(style);
+    };
+    if (document.documentElement) install();
+    else document.addEventListener('DOMContentLoaded', install, { once: true });
+})()
+"""
+
+
+class LeanMode:
+    """Blocks resource classes and animations on one tab and counts what was skipped"""
+
+    def __init__(self, chrome_client, block: List[str] = None):
+        unknown = set(block or []) - set(RESOURCE_CLASSES)
+        if unknown:
+            raise ValueError(f"Unknown lean resource classes: {', '.join(sorted(unknown))}")
+        self.chrome_client = chrome_client
+        self.block = list(DEFAULT_LEAN_BLOCK if block is None else block)
+        self.logger = logging.getLogger(__name__)
+        self.blocked: Dict[str, int] = {name: 0 for name in self.block}
+        self.skipped_bytes = 0
+        self.unknown_sizes = 0
+        self._type_classes = {
+            pattern["resourceType"]: name for name in self.block
+            for pattern in RESOURCE_CLASSES[name] if "resourceType" in pattern
+        }
+        self._url_classes = [
+            (pattern["urlPattern"], name) for name in self.block
+            for pattern in RESOURCE_CLASSES[name] if "urlPattern" in pattern
+        ]
+        chrome_client.on("Fetch.requestPaused", self._on_request_paused)
+        # A new DevTools session starts without interception, scripts or emulation
+        chrome_client.on_reconnect(self.apply)
+
+    async def apply(self):
+        """Enable interception, the no-animation stylesheet and reduced motion on the current session"""
+        client = self.chrome_client
+        patterns = [pattern for name in self.block for pattern in RESOURCE_CLASSES[name]]
+        if patterns:
+            await client._send_command("Fetch.enable", {"patterns": patterns})
+        await client._send_command("Page.addScriptToEvaluateOnNewDocument", {"source": NO_ANIMATION_SOURCE})
+        await client._send_command("Runtime.evaluate", {"expression": NO_ANIMATION_SOURCE})
+        await client._send_command("Emulation.setEmulatedMedia", {
+            "features": [{"name": "prefers-reduced-motion", "value": "reduce"}]
+        })
+        self.logger.info(f"Lean mode on: blocking {', '.join(self.block) or 'nothing'}, animations disabled")
+
+    def _classify(self, params: Dict[str, Any]) -> str:
+        if "responseStatusCode" in params or "responseErrorReason" in params:
+            return self._type_classes.get(params.get("resourceType"), "other")
+        url = params.get("request", {}).get("url", "")
+        for pattern, name in self._url_classes:
+            if fnmatch.fnmatchcase(url, pattern):
+                return name
+        return self._type_classes.get(params.get("resourceType"), "other")
+
+    async def _on_request_paused(self, params: Dict[str, Any]):
+        name = self._classify(params)
+        self.blocked[name] = self.blocked.get(name, 0) + 1
+        METRICS.inc("lean_blocked_requests", resource=name)
+        if "responseStatusCode" in params:
+            length = next((header["value"] for header in params.get("responseHeaders", [])
+                           if header.get("name", "").lower() == "content-length"), None)
+            if length and length.isdigit():
+                self.skipped_bytes += int(length)
+                METRICS.inc("lean_skipped_bytes", int(length), resource=name)
+            else:
+                self.unknown_sizes += 1
+        try:
+            await self.chrome_client._send_command("Fetch.failRequest", {
+                "requestId": params["requestId"], "errorReason": "BlockedByClient"
+            })
+        except Exception as e:
+            self.logger.debug(f"Could not block {params.get('request', {}).get('url')}: {e}")
+
+    def summary(self) -> str:
+        total = sum(self.blocked.values())
+        by_class = ", ".join(f"{name} {count}" for name, count in self.blocked.items() if count)
+        unknown = f" (+{self.unknown_sizes} of unknown size)" if self.unknown_sizes else ""
+        return (f"lean mode blocked {total} requests{f' ({by_class})' if by_class else ''}, "
+                f"{self.skipped_bytes / 1024:.0f} KB not downloaded{unknown}")
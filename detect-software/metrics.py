@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Metrics - Latency histograms and counters for the automation pipeline
+
+Histograms use HDR-style log-linear buckets (about 1% relative error at any
+magnitude, memory bounded by the value range rather than the sample count),
+so per-stage and per-CDP-method latencies can be recorded for an overnight
+run. The registry is exported as Prometheus text over HTTP and/or written
+periodically as a JSON snapshot.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional, Tuple
+
+
+# 2**7 sub-buckets per power of two: < 1% relative error
+SUB_BUCKET_BITS = 7
+QUANTILES = (0.5, 0.9, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """HDR-style histogram of durations, recorded with microsecond resolution"""
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    @staticmethod
+    def _bucket(micros: int) -> int:
+        shift = max(0, micros.bit_length() - SUB_BUCKET_BITS)
+        return (shift << SUB_BUCKET_BITS) | (micros >> shift)
+
+    @staticmethod
+    def _bucket_value(bucket: int) -> int:
+        shift = bucket >> SUB_BUCKET_BITS
+        sub = bucket & ((1 << SUB_BUCKET_BITS) - 1)
+        # Midpoint of the bucket's range
+        return (sub << shift) + ((1 << shift) >> 1)
+
+    def record(self, seconds: float):
+        micros = max(0, int(seconds * 1_000_000))
+        bucket = self._bucket(micros)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, quantile: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = max(1, int(round(quantile * self.count)))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                value = self._bucket_value(bucket) / 1_000_000
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        data = {
+            'count': self.count,
+            'sum': round(self.total, 6),
+            'min': self.min,
+            'max': self.max,
+        }
+        for quantile in QUANTILES:
+            data[f'p{int(quantile * 100)}'] = self.percentile(quantile)
+        return data
+
+
+class MetricsRegistry:
+    """Thread-safe collection of labelled counters and histograms"""
+
+    def __init__(self, prefix: str = "whisk"):
+        self.prefix = prefix
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels: Dict[str, object]) -> LabelKey:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            self.histograms.setdefault(name, {}).setdefault(key, Histogram()).record(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Record the duration of the with-block, including when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> Dict[str, object]:
+        """All series as plain JSON-serialisable data"""
+        with self._lock:
+            return {
+                'time': time.time(),
+                'counters': {
+                    name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                    for name, series in self.counters.items()
+                },
+                'histograms': {
+                    name: [{'labels': dict(key), **histogram.summary()} for key, histogram in series.items()]
+                    for name, series in self.histograms.items()
+                },
+            }
+
+    def write_snapshot(self, path: str):
+        """Atomically write the current snapshot as JSON"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _format_labels(key: LabelKey, extra: Dict[str, str] = None) -> str:
+        pairs = list(key) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        escaped = (
+            f'{k}="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+            for k, v in pairs
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition; histograms are exported as summaries"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                metric = f"{self.prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in series.items():
+                    lines.append(f"{metric}{self._format_labels(key)} {value}")
+
+            for name, series in sorted(self.histograms.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} summary")
+                for key, histogram in series.items():
+                    for quantile in QUANTILES:
+                        value = histogram.percentile(quantile)
+                        labels = self._format_labels(key, {'quantile': str(quantile)})
+                        lines.append(f"{metric}{labels} {value if value is not None else 'NaN'}")
+                    lines.append(f"{metric}_sum{self._format_labels(key)} {histogram.total}")
+                    lines.append(f"{metric}_count{self._format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry, shared by the CDP client and the automator
+METRICS = MetricsRegistry()
+
+
+class MetricsExporter:
+    """Serves a registry over HTTP (/metrics) and/or writes periodic JSON snapshots"""
+
+    def __init__(self, registry: MetricsRegistry = METRICS):
+        self.registry = registry
+        self.logger = logging.getLogger(__name__)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self._snapshot_path: Optional[str] = None
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """Start the Prometheus endpoint in a daemon thread"""
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] == '/metrics.json':
+                    body = json.dumps(registry.snapshot()).encode('utf-8')
+                    content_type = 'application/json'
+                elif self.path.split('?')[0] in ('/', '/metrics'):
+                    body = registry.prometheus_text().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.logger.info(f"Metrics available at http://{host}:{port}/metrics")
+
+    def start_snapshots(self, path: str, interval: float = 15.0):
+        """Write a JSON snapshot every interval seconds (and once more on stop)"""
+        async def loop():
+            while True:
+                await asyncio.sleep(interval)
+                self._write(path)
+
+        self._snapshot_path = path
+        self._snapshot_task = asyncio.create_task(loop())
+
+    def _write(self, path: str):
+        try:
+            self.registry.write_snapshot(path)
+        except OSError as e:
+            self.logger.warning(f"Failed to write metrics snapshot: {e}")
+
+    async def stop(self):
+        if self._snapshot_task:
+            self._snapshot_task.cancel()
+            try:
+                await self._snapshot_task
+            except asyncio.CancelledError:
+                pass
+            self._snapshot_task = None
+            self._write(self._snapshot_path)
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
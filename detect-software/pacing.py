@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Adaptive Pacing - AIMD control of prompt spacing and concurrency
+
+Workers call acquire() before submitting a prompt and release() with the
+observed outcome afterwards. A run of healthy, fast completions additively
+shrinks the gap between submissions and lets one more tab work at a time;
+failures and quota signals multiplicatively widen the gap and halve the
+number of active tabs. Latency is judged against the fastest generation in a
+recent window, so a lasting shift in Whisk's speed becomes the new baseline.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+
+class AdaptivePacer:
+    """Additive-increase / multiplicative-decrease scheduler for prompt submissions"""
+
+    def __init__(self, initial_gap: float = 2.0, max_workers: int = 1, min_gap: float = 0.0,
+                 max_gap: float = 60.0, gap_step: float = 0.25, backoff: float = 2.0,
+                 adaptive: bool = True, latency_window: int = 20, logger: logging.Logger = None):
+        self.gap = initial_gap
+        self.min_gap = min_gap
+        self.max_gap = max_gap
+        self.gap_step = gap_step
+        self.backoff = backoff
+        self.max_workers = max(1, max_workers)
+        self.limit = self.max_workers
+        self.adaptive = adaptive
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.latency_ewma: Optional[float] = None
+        self._recent_latencies = deque(maxlen=max(1, latency_window))
+        self.successes = 0
+        self.failures = 0
+        self._streak = 0
+        self._active = 0
+        self._next_slot = 0.0
+        self._condition = asyncio.Condition()
+
+    @property
+    def rate_per_hour(self) -> Optional[float]:
+        """Expected prompts per hour at the current gap, limit and latency"""
+        if self.latency_ewma is None:
+            return None
+        cycle = max(self.latency_ewma + self.gap, 1e-6)
+        return min(self.limit / cycle, 1 / max(self.gap, 1e-6)) * 3600
+
+    async def acquire(self):
+        """Wait for a free worker slot and for the gap since the last submission"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.gap
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def release(self, ok: bool, latency: Optional[float] = None, quota: bool = False):
+        """Return a slot and feed the outcome of the prompt into the controller"""
+        async with self._condition:
+            self._active -= 1
+            if ok:
+                self.successes += 1
+            else:
+                self.failures += 1
+            if self.adaptive:
+                self._adjust(ok, latency, quota)
+            self._condition.notify_all()
+
+    async def retry(self, quota: bool = False):
+        """Back off now and wait for the next submission slot before retrying
+
+        The worker keeps its slot; the final release() of the prompt still
+        reports the combined outcome.
+        """
+        async with self._condition:
+            if self.adaptive:
+                self._back_off(quota)
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.gap
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    @property
+    def best_latency(self) -> Optional[float]:
+        """Fastest generation among the recent ones"""
+        return min(self._recent_latencies, default=None)
+
+    def _back_off(self, quota: bool):
+        # Multiplicative decrease; quota errors back off twice as hard
+        factor = self.backoff * (2 if quota else 1)
+        self.gap = min(self.max_gap, max(self.gap, self.gap_step) * factor)
+        self.limit = 1 if quota else max(1, self.limit // 2)
+        self._streak = 0
+        self.log_rate("quota" if quota else "error")
+
+    def _adjust(self, ok: bool, latency: Optional[float], quota: bool):
+        if latency is not None:
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            self._recent_latencies.append(latency)
+
+        if not ok:
+            self._back_off(quota)
+            return
+
+        if quota:
+            # Succeeded only after a quota retry, which already backed off
+            self._streak = 0
+            return
+
+        if latency is None or (self.best_latency and self.latency_ewma > 1.5 * self.best_latency):
+            # Whisk is slowing down (or never confirmed the generation): ease off
+            # gently instead of speeding up
+            self.gap = min(self.max_gap, self.gap + self.gap_step)
+            self._streak = 0
+            self.log_rate("slow")
+            return
+
+        # Additive increase after a full round of healthy completions
+        self._streak += 1
+        if self._streak >= self.limit:
+            self._streak = 0
+            previous = (self.gap, self.limit)
+            self.gap = max(self.min_gap, self.gap - self.gap_step)
+            self.limit = min(self.max_workers, self.limit + 1)
+            if (self.gap, self.limit) != previous:
+                self.log_rate("healthy")
+
+    def log_rate(self, reason: str):
+        latency = f"{self.latency_ewma:.1f}s" if self.latency_ewma is not None else "n/a"
+        rate = self.rate_per_hour
+        rate_text = f", ~{rate:.0f} prompts/h" if rate else ""
+        self.logger.info(
+            f"Pacing ({reason}): gap {self.gap:.2f}s, {self.limit}/{self.max_workers} tabs active, "
+            f"latency {latency}{rate_text}"
+        )
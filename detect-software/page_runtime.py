@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Page Runtime - Helper library preinstalled in the Whisk tab
+
+The helpers are injected once per tab (and re-injected on every new document
+via Page.addScriptToEvaluateOnNewDocument). Python invokes them with
+Runtime.callFunctionOn and structured arguments, so no prompt text is ever
+spliced into JavaScript source.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+HELPER_SOURCE = r"""
+(() => {
+    if (window.__whiskHelpers) return;
+
+    const nativeValueSetter = Object.getOwnPropertyDescriptor(
+        window.HTMLTextAreaElement.prototype, 'value'
+    ).set;
+
+    const resolve = (target) => typeof target === 'string' ? document.querySelector(target) : target;
+
+    // A cached handle while it is attached, else whatever the selector matches now
+    const live = (node, selector) => node && node.isConnected ? node : document.querySelector(selector);
+
+    const dispatch = (element, type, init) => {
+        const event = new Event(type, Object.assign({ bubbles: true }, init || {}));
+        Object.defineProperty(event, 'target', { value: element, enumerable: true });
+        element.dispatchEvent(event);
+    };
+
+    const enable = (button) => {
+        button.disabled = false;
+        button.removeAttribute('disabled');
+    };
+
+    const helpers = {
+        fill(target, text) {
+            const textarea = resolve(target);
+            if (!textarea) return { success: false, error: 'Textarea not found' };
+
+            // Clear with React's native value setter, then set the new value
+            textarea.focus();
+            nativeValueSetter.call(textarea, '');
+            dispatch(textarea, 'input');
+            nativeValueSetter.call(textarea, text);
+            dispatch(textarea, 'input', { cancelable: true });
+
+            // Comprehensive event sequence for React, then re-focus
+            ['change', 'blur', 'focusout'].forEach(type => dispatch(textarea, type));
+            textarea.focus();
+
+            // One more input event once React has flushed the first batch
+            return new Promise(done => setTimeout(() => {
+                dispatch(textarea, 'input');
+                done({ success: true, length: textarea.value.length });
+            }, 100));
+        },
+
+        focusForInput(target) {
+            const textarea = resolve(target);
+            if (!textarea) return false;
+            textarea.focus();
+            textarea.select();
+            return true;
+        },
+
+        click(target) {
+            const element = resolve(target);
+            if (!element || element.disabled) return false;
+            element.click();
+            return true;
+        },
+
+        snapshot(target, textareaSelector) {
+            const button = resolve(target);
+            if (!button) return { found: false };
+
+            const style = window.getComputedStyle(button);
+            const form = button.closest('form');
+            const textarea = document.querySelector(textareaSelector);
+            const value = textarea ? textarea.value : '';
+
+            return {
+                found: true,
+                disabled: button.disabled,
+                hasDisabledAttr: button.hasAttribute('disabled'),
+                disabledAttrValue: button.getAttribute('disabled'),
+                visible: button.offsetParent !== null,
+                clickable: !button.disabled && button.offsetParent !== null,
+                opacity: style.opacity,
+                pointerEvents: style.pointerEvents,
+                formValid: form ? form.checkValidity() : true,
+                textareaLength: value.length,
+                textareaValue: value.substring(0, 50) + (value.length > 50 ? '...' : '')
+            };
+        },
+
+        forceClick(target, method) {
+            const button = resolve(target);
+            if (!button) return { success: false, error: 'Button not found' };
+
+            if (method === 'icon_click') {
+                const icon = button.querySelector('i.google-symbols');
+                if (!icon) return { success: false, error: 'Icon not found' };
+                enable(button);
+                icon.click();
+            } else if (method === 'mouse_events') {
+                enable(button);
+                const rect = button.getBoundingClientRect();
+                const position = {
+                    bubbles: true,
+                    cancelable: true,
+                    clientX: rect.left + rect.width / 2,
+                    clientY: rect.top + rect.height / 2
+                };
+                ['mousedown', 'mouseup', 'click'].forEach(type =>
+                    button.dispatchEvent(new MouseEvent(type, position))
+                );
+            } else if (method === 'form_submit') {
+                const form = button.closest('form');
+                if (form) {
+                    form.submit();
+                } else {
+                    button.dispatchEvent(new Event('submit', { bubbles: true }));
+                    return { success: true, method: 'submit_event' };
+                }
+            } else {
+                enable(button);
+                button.click();
+            }
+            return { success: true, method: method };
+        },
+
+        buttonReady(node, selector) {
+            const button = live(node, selector);
+            if (!button || button.disabled || button.offsetParent === null) return null;
+            return { clickable: true, opacity: window.getComputedStyle(button).opacity };
+        },
+
+        generationStarted(buttonNode, buttonSelector, textareaNode, textareaSelector) {
+            const loadingSelectors = [
+                '.loading', '.spinner', '[data-loading="true"]',
+                '.generating', '.progress', '[aria-busy="true"]'
+            ];
+            const hasLoading = loadingSelectors.some(selector => document.querySelector(selector) !== null);
+
+            // Button disappeared or changed, textarea cleared or disabled, URL changed
+            const button = live(buttonNode, buttonSelector);
+            const buttonChanged = !button || button.textContent !== 'arrow_forward';
+            const textarea = live(textareaNode, textareaSelector);
+            const textareaChanged = !textarea || textarea.disabled || textarea.value === '';
+            const urlChanged = window.location.href.includes('generating') ||
+                               window.location.href.includes('result');
+
+            // null until started, so it can be waited on with until()
+            if (!(hasLoading || buttonChanged || urlChanged)) return null;
+            return {
+                hasLoading: hasLoading,
+                buttonChanged: buttonChanged,
+                textareaChanged: textareaChanged,
+                urlChanged: urlChanged
+            };
+        },
+
+        until(name, timeoutMs, ...args) {
+            // Re-run a helper on every DOM change until it returns a truthy value
+            const test = () => {
+                try {
+                    return helpers[name](...args);
+                } catch (e) {
+                    return null;
+                }
+            };
+            const initial = test();
+            if (initial) return initial;
+
+            return new Promise(done => {
+                const finish = (value) => {
+                    observer.disconnect();
+                    clearInterval(fallback);
+                    clearTimeout(timer);
+                    done(value);
+                };
+                const recheck = () => {
+                    const value = test();
+                    if (value) finish(value);
+                };
+                const observer = new MutationObserver(recheck);
+                observer.observe(document.documentElement, {
+                    childList: true,
+                    subtree: true,
+                    attributes: true,
+                    characterData: true
+                });
+                // Property-only changes (e.g. .disabled set without an attribute) emit no mutations
+                const fallback = setInterval(recheck, 500);
+                const timer = setTimeout(() => finish(null), timeoutMs);
+            });
+        },
+
+        watchGeneration(token, loadingSelector, resultSelector, bindingName) {
+            const baseline = document.querySelectorAll(resultSelector).length;
+            const started = performance.now();
+            let sawLoading = false;
+            let idleTimer = null;
+
+            if (helpers.generationObserver) helpers.generationObserver.disconnect();
+
+            const report = (status) => {
+                observer.disconnect();
+                clearTimeout(idleTimer);
+                helpers.generationObserver = null;
+                // Kept so a client that reconnected after the fact can still collect it
+                helpers.lastReport = JSON.stringify({
+                    token: token,
+                    status: status,
+                    alert: status === 'done' ? '' : Array.from(
+                        document.querySelectorAll('[role="alert"], [role="status"], [aria-live="assertive"]')
+                    ).map(element => element.textContent.trim()).join(' ').substring(0, 300),
+                    outputs: document.querySelectorAll(resultSelector).length - baseline,
+                    elapsed: (performance.now() - started) / 1000
+                });
+                if (typeof window[bindingName] === 'function') window[bindingName](helpers.lastReport);
+            };
+
+            const check = () => {
+                const loading = document.querySelector(loadingSelector) !== null;
+                const outputs = document.querySelectorAll(resultSelector).length - baseline;
+                if (loading) {
+                    sawLoading = true;
+                    clearTimeout(idleTimer);
+                    idleTimer = null;
+                    return;
+                }
+                if (outputs > 0) {
+                    report('done');
+                } else if (sawLoading && !idleTimer) {
+                    // Loading finished without new outputs; give late images a moment
+                    idleTimer = setTimeout(() => report('no_output'), 3000);
+                }
+            };
+
+            const observer = new MutationObserver(check);
+            observer.observe(document.body, {
+                childList: true,
+                subtree: true,
+                attributes: true,
+                attributeFilter: ['class', 'src', 'aria-busy', 'data-loading']
+            });
+            helpers.generationObserver = observer;
+            return baseline;
+        },
+
+        lastGeneration() {
+            return helpers.lastReport || null;
+        }
+    };
+
+    Object.defineProperty(window, '__whiskHelpers', { value: helpers, configurable: true });
+})();
+"""
+
+# Dispatches to a helper by name; `this` is the helper object. Cached element
+# handles that were detached from the document are reported instead of used.
+CALL_HELPER = """function(name, ...args) {
+    if (args.some(arg => arg instanceof Node && !arg.isConnected)) return {__stale: true};
+    return this[name](...args);
+}"""
+
+# Resolves a selector to a node handle; `this` is the helper object
+QUERY_SELECTOR = "function(selector) { return document.querySelector(selector); }"
+
+# Errors Chrome reports when a cached object id belongs to a destroyed context
+STALE_OBJECT_ERRORS = ("Cannot find context", "Could not find object", "Inspected target navigated")
+
+
+@dataclass(frozen=True)
+class ElementRef:
+    """A selector whose resolved node handle is cached by PageRuntime"""
+    selector: str
+
+
+class PageRuntime:
+    """Installs the page helpers in a tab and calls them via Runtime.callFunctionOn
+
+    Helper arguments given as ElementRef are passed as RemoteObject handles.
+    Each selector is resolved once and reused until the page's execution
+    context is cleared or the node detaches. Only Runtime events are watched,
+    so the DOM domain and its mutation events can stay off.
+    """
+
+    def __init__(self, chrome_client):
+        self.chrome_client = chrome_client
+        self.logger = logging.getLogger(__name__)
+        self._helpers_id: Optional[str] = None
+        self._script_id: Optional[str] = None
+        self._elements: Dict[str, str] = {}
+        chrome_client.on("Runtime.executionContextsCleared", self._invalidate)
+        chrome_client.on_reconnect(self._reinstall)
+
+    def _invalidate(self, params=None):
+        """Forget every handle; the page navigated or reloaded"""
+        self._helpers_id = None
+        self._elements.clear()
+
+    async def _reinstall(self):
+        """A new DevTools session has none of the old scripts or object handles"""
+        self._script_id = None
+        self._invalidate()
+        await self.install()
+
+    async def wait(self, name: str, timeout: float, *args: Any) -> Any:
+        """Wait in the page until a helper returns a truthy value; None on timeout
+
+        The helper is re-run on DOM changes with the same (cached) element
+        handles, so selectors are not re-queried on every mutation.
+        """
+        return await self.call('until', name, int(timeout * 1000), *args,
+                               timeout=timeout + self.chrome_client.command_timeout)
+
+    def element(self, selector: str) -> ElementRef:
+        """Reference to the first element matching selector, resolved lazily"""
+        return ElementRef(selector)
+
+    async def install(self):
+        """Inject the helpers into the current document and every future one"""
+        if self._script_id is None:
+            result = await self.chrome_client._send_command(
+                "Page.addScriptToEvaluateOnNewDocument", {"source": HELPER_SOURCE}
+            )
+            self._script_id = result.get("identifier")
+        await self._resolve_helpers()
+
+    async def _resolve_helpers(self) -> str:
+        """Return the object id of window.__whiskHelpers, injecting it if missing"""
+        if self._helpers_id:
+            return self._helpers_id
+
+        result = await self.chrome_client._send_command("Runtime.evaluate", {
+            "expression": f"{HELPER_SOURCE}\nwindow.__whiskHelpers"
+        })
+        if result.get("exceptionDetails"):
+            raise Exception(f"Failed to install page helpers: {result['exceptionDetails']}")
+
+        self._helpers_id = result["result"]["objectId"]
+        return self._helpers_id
+
+    async def _resolve_element(self, selector: str) -> Optional[str]:
+        """Return a cached node handle for selector, querying the page on a miss"""
+        object_id = self._elements.get(selector)
+        if object_id:
+            return object_id
+
+        result = await self.chrome_client._send_command("Runtime.callFunctionOn", {
+            "functionDeclaration": QUERY_SELECTOR,
+            "objectId": await self._resolve_helpers(),
+            "arguments": [{"value": selector}]
+        })
+        object_id = result.get("result", {}).get("objectId")
+        if object_id:
+            self._elements[selector] = object_id
+            self.logger.debug(f"Resolved element handle for {selector}")
+        return object_id
+
+    async def _argument(self, arg: Any) -> Dict[str, Any]:
+        """Convert a helper argument to a CDP CallArgument"""
+        if isinstance(arg, ElementRef):
+            object_id = await self._resolve_element(arg.selector)
+            return {"objectId": object_id} if object_id else {"value": None}
+        return {"value": arg}
+
+    async def call(self, name: str, *args: Any, timeout: float = None, resend: bool = True) -> Any:
+        """Call a page helper by name and return its (awaited) value
+
+        Helpers that change page state (click, forceClick) pass resend=False,
+        so a call cut off by a dropped connection is not repeated blindly.
+        """
+        for attempt in range(3):
+            helpers_id = await self._resolve_helpers()
+            arguments = [{"value": name}] + [await self._argument(arg) for arg in args]
+            try:
+                result = await self.chrome_client._send_command("Runtime.callFunctionOn", {
+                    "functionDeclaration": CALL_HELPER,
+                    "objectId": helpers_id,
+                    "arguments": arguments,
+                    "returnByValue": True,
+                    "awaitPromise": True
+                }, timeout=timeout, resend=resend)
+            except Exception as e:
+                if attempt < 2 and any(marker in str(e) for marker in STALE_OBJECT_ERRORS):
+                    self._invalidate()
+                    continue
+                raise
+
+            if result.get("exceptionDetails"):
+                raise Exception(f"Page helper {name} failed: {result['exceptionDetails']}")
+
+            value = result.get("result", {}).get("value")
+            if isinstance(value, dict) and value.get("__stale") and attempt < 2:
+                # A cached node was detached (e.g. React re-mounted it); re-resolve
+                for arg in args:
+                    if isinstance(arg, ElementRef):
+                        self._elements.pop(arg.selector, None)
+                continue
+            return value
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Profile Store - Named, persistent Chrome profiles and cleanup of stale ones
+
+Each account gets its own user-data-dir that is reused across launches, so the
+Google login, HTTP cache and V8 code cache stay warm. Profiles unused for a
+long time are removed, the least recently used pool profiles (port-<n>) are
+evicted when the store grows past its size budget, and the
+chrome-debug-<timestamp> directories older launchers left in the temp folder
+are swept up once they are old enough. Named account profiles are never
+evicted for size, and profiles a running Chrome holds locked are never touched.
+"""
+
+import logging
+import os
+import re
+import shutil
+import socket
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+
+DEFAULT_PROFILE_ROOT = Path.home() / ".whisk_automation" / "profiles"
+LEGACY_PREFIX = "chrome-debug-"
+POOL_PREFIX = "port-"  # unnamed profiles of pool browsers, one per debug port
+LAST_USED_MARKER = ".whisk_last_used"
+
+
+def directory_size(path: Path) -> int:
+    """Total size of the files under path, ignoring ones that vanish or can't be read"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def profile_in_use(path: Path) -> bool:
+    """Whether a live Chrome holds the profile's singleton lock"""
+    lock = Path(path) / "SingletonLock"
+    if lock.is_symlink():
+        # POSIX: the link target is "<hostname>-<pid>"
+        host, _, pid = os.readlink(lock).rpartition("-")
+        if host != socket.gethostname() or not pid.isdigit():
+            return True
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass  # exists but belongs to another user
+        return True
+    # Windows: Chrome holds "lockfile" open without delete sharing while it
+    # runs, so only a stale one left by a crash can be removed
+    lockfile = Path(path) / "lockfile"
+    if lockfile.exists():
+        try:
+            lockfile.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return True
+    return lock.exists()
+
+
+class ProfileStore:
+    """Per-account Chrome user-data-dirs under one root, with garbage collection"""
+
+    def __init__(self, root: Path = DEFAULT_PROFILE_ROOT, max_age_days: float = 30,
+                 max_total_mb: float = 4096, stale_debug_hours: float = 24):
+        self.root = Path(root)
+        self.max_age = max_age_days * 86400
+        self.max_total_bytes = max_total_mb * 1024 * 1024
+        self.stale_debug_age = stale_debug_hours * 3600
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def safe_name(name: str) -> str:
+        """Profile directory name for an account label such as an email address"""
+        cleaned = re.sub(r"[^A-Za-z0-9._@-]+", "_", name.strip()).strip("._")
+        if not cleaned:
+            raise ValueError(f"Invalid profile name: {name!r}")
+        return cleaned
+
+    def path(self, name: str) -> Path:
+        return self.root / self.safe_name(name)
+
+    def acquire(self, name: str) -> Path:
+        """Create the profile if needed and mark it as just used"""
+        path = self.path(name)
+        path.mkdir(parents=True, exist_ok=True)
+        (path / LAST_USED_MARKER).touch()
+        return path
+
+    def profiles(self) -> List[Path]:
+        if not self.root.is_dir():
+            return []
+        return [path for path in self.root.iterdir() if path.is_dir()]
+
+    @staticmethod
+    def last_used(path: Path) -> float:
+        marker = path / LAST_USED_MARKER
+        try:
+            return marker.stat().st_mtime if marker.exists() else path.stat().st_mtime
+        except OSError:
+            return 0.0
+
+    def _remove(self, path: Path, reason: str) -> bool:
+        try:
+            shutil.rmtree(path)
+        except OSError as e:
+            self.logger.warning(f"Could not remove profile {path}: {e}")
+            return False
+        self.logger.info(f"🧹 Removed {reason} profile {path}")
+        return True
+
+    def collect_garbage(self, keep: Iterable[str] = (), temp_dir: str = None) -> Dict[str, int]:
+        """Remove abandoned profiles; returns how many were removed and how many bytes freed
+
+        keep names profiles that must survive regardless of age or size,
+        typically the ones about to be launched.
+        """
+        keep_paths = {self.path(name) for name in keep}
+        now = time.time()
+        stats = {'removed': 0, 'freed_bytes': 0}
+
+        def remove(path: Path, size: int, reason: str) -> bool:
+            if not self._remove(path, reason):
+                return False
+            stats['removed'] += 1
+            stats['freed_bytes'] += size
+            return True
+
+        # Temp-dir profiles from older launchers are never reused
+        temp_root = Path(temp_dir or tempfile.gettempdir())
+        for path in temp_root.glob(f"{LEGACY_PREFIX}*"):
+            try:
+                stale = path.is_dir() and now - path.stat().st_mtime > self.stale_debug_age
+            except OSError:
+                continue
+            if stale and not profile_in_use(path):
+                remove(path, directory_size(path), "stale debug")
+
+        # Store profiles: drop the expired ones, then evict pool profiles by least
+        # recent use; account logins are too costly to lose just for disk space
+        candidates = []
+        total = 0
+        for path in self.profiles():
+            size = directory_size(path)
+            if path in keep_paths or profile_in_use(path):
+                total += size
+            elif now - self.last_used(path) > self.max_age:
+                remove(path, size, "unused")
+            else:
+                total += size
+                if path.name.startswith((POOL_PREFIX, LEGACY_PREFIX)):
+                    candidates.append((self.last_used(path), path, size))
+
+        for _, path, size in sorted(candidates, key=lambda item: item[0]):
+            if total <= self.max_total_bytes:
+                break
+            if remove(path, size, "least recently used"):
+                total -= size
+
+        if stats['removed']:
+            self.logger.info(f"🧹 Freed {stats['freed_bytes'] / 1024 / 1024:.1f} MB from {stats['removed']} old profiles")
+        return stats
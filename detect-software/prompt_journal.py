@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Prompt Journal - Crash-safe, append-only record of prompt outcomes
+
+Every prompt gets a "started" entry before it is submitted and a "done" or
+"failed" entry afterwards. Entries are keyed by the prompt's position in the
+batch and a hash of its text, so a resumed run can skip finished work even if
+the process died mid-batch. The file stays open, and each entry is written
+and fsynced in a worker thread so the event loop never waits on the disk.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+RUN_ALL = "all"
+RUN_RESUME = "resume"
+RUN_RETRY_FAILED = "retry-failed"
+
+
+class PromptJournal:
+    """Append-only JSONL journal of prompt status, attempts and timings"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.logger = logging.getLogger(__name__)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._file = None
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def prompt_hash(prompt: str) -> str:
+        return hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def prompt_key(cls, offset: int, prompt: str) -> str:
+        return f"{offset}:{cls.prompt_hash(prompt)}"
+
+    def _load(self):
+        """Replay the journal; the last entry for each key wins"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    continue
+                self.entries[entry['key']] = entry
+        self.logger.info(f"Loaded {len(self.entries)} journal entries from {self.path}")
+
+    def status(self, offset: int, prompt: str) -> Optional[str]:
+        entry = self.entries.get(self.prompt_key(offset, prompt))
+        return entry['status'] if entry else None
+
+    def should_process(self, offset: int, prompt: str, mode: str) -> bool:
+        """Whether a prompt needs to run under the given mode"""
+        status = self.status(offset, prompt)
+        if mode == RUN_RESUME:
+            return status != 'done'
+        if mode == RUN_RETRY_FAILED:
+            return status == 'failed'
+        return True
+
+    async def record(self, offset: int, prompt: str, status: str, **fields: Any):
+        """Append an entry and flush it to disk before returning"""
+        entry = {
+            'key': self.prompt_key(offset, prompt),
+            'offset': offset,
+            'hash': self.prompt_hash(prompt),
+            'status': status,
+            'time': time.time(),
+        }
+        entry.update(fields)
+        self.entries[entry['key']] = entry
+        await asyncio.to_thread(self._append, json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def _append(self, line: str):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        """Close the journal file; the next record() reopens it"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def resume_offset(self, mode: str) -> Optional[int]:
+        """First offset a run in this mode may need to look at; None if nothing is left
+
+        Lets file-backed prompt sources seek past the finished head of a batch.
+        For RUN_RESUME this only counts offsets and is an upper bound: the
+        caller must confirm each skipped prompt's hash against the source,
+        since the journal can hold entries from other batches.
+        """
+        if mode == RUN_RESUME:
+            done = {entry['offset'] for entry in self.entries.values() if entry['status'] == 'done'}
+            offset = 0
+            while offset in done:
+                offset += 1
+            return offset
+        if mode == RUN_RETRY_FAILED:
+            failed = [entry['offset'] for entry in self.entries.values() if entry['status'] == 'failed']
+            return min(failed) if failed else None
+        return 0
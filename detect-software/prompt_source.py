@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Prompt Source - Streaming prompt input for the automator
+
+Prompts come from a plain text file (one per line), a JSONL file (one object
+with a "prompt" field, or a bare string, per line) or any in-memory iterable
+or async iterable. File sources build a byte-offset index in a single pass
+without decoding, so counting is cheap and a resume can seek straight to
+prompt N instead of re-reading everything before it.
+"""
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from array import array
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterable, Optional, Tuple, Union
+
+
+class PromptSource(ABC):
+    """Yields (offset, prompt) pairs; offset is the prompt's position in the source"""
+
+    def count(self) -> Optional[int]:
+        """Number of prompts, if known without consuming the source"""
+        return None
+
+    @abstractmethod
+    def __aiter__(self) -> AsyncIterator[Tuple[int, str]]:
+        """Iterate (offset, prompt) pairs from the current start offset"""
+
+
+class TextFilePromptSource(PromptSource):
+    """One prompt per non-empty line of a UTF-8 text file"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.logger = logging.getLogger(__name__)
+        self._index: Optional[array] = None
+        self._start = 0
+
+    def _build_index(self) -> array:
+        """Byte offsets of every non-empty line, in one pass over the raw file"""
+        if self._index is None:
+            index = array('q')
+            position = 0
+            with open(self.path, 'rb') as f:
+                for raw in f:
+                    if raw.strip():
+                        index.append(position)
+                    position += len(raw)
+            self._index = index
+        return self._index
+
+    def count(self) -> int:
+        return len(self._build_index())
+
+    def seek(self, offset: int):
+        """Start the next iteration at prompt offset"""
+        self._start = max(0, offset)
+
+    def _parse(self, line: str) -> Optional[str]:
+        return line.strip() or None
+
+    def _line_number(self, position: int) -> int:
+        """1-based line number of the line starting at a byte position"""
+        with open(self.path, 'rb') as f:
+            return f.read(position).count(b'\n') + 1
+
+    async def __aiter__(self) -> AsyncIterator[Tuple[int, str]]:
+        index = self._build_index()
+        if self._start >= len(index):
+            return
+        offset = self._start
+        with open(self.path, 'rb') as f:
+            f.seek(index[offset])
+            for raw in f:
+                if not raw.strip():
+                    continue
+                try:
+                    prompt = self._parse(raw.decode('utf-8'))
+                except ValueError as e:
+                    # UnicodeDecodeError and JSONDecodeError are both ValueErrors
+                    self.logger.warning(f"Skipping unreadable line {self._line_number(index[offset])} of {self.path}: {e}")
+                    prompt = None
+                if prompt:
+                    yield offset, prompt
+                offset += 1
+
+
+class JsonlPromptSource(TextFilePromptSource):
+    """One JSON value per line: {"prompt": "..."} objects or bare strings"""
+
+    def __init__(self, path: Union[str, Path], field: str = "prompt"):
+        super().__init__(path)
+        self.field = field
+
+    def _parse(self, line: str) -> Optional[str]:
+        value = json.loads(line)
+        if isinstance(value, dict):
+            value = value.get(self.field)
+        return value.strip() if isinstance(value, str) and value.strip() else None
+
+
+class IterablePromptSource(PromptSource):
+    """Prompts handed over in memory (a list, generator or async iterable)"""
+
+    def __init__(self, prompts: Union[Iterable[str], AsyncIterator[str]]):
+        self.prompts = prompts
+        self._start = 0
+
+    def count(self) -> Optional[int]:
+        if isinstance(self.prompts, (list, tuple)):
+            return sum(1 for prompt in self.prompts if prompt.strip())
+        return None
+
+    def seek(self, offset: int):
+        self._start = max(0, offset)
+
+    async def __aiter__(self) -> AsyncIterator[Tuple[int, str]]:
+        offset = 0
+        if hasattr(self.prompts, '__aiter__'):
+            async for prompt in self.prompts:
+                if prompt.strip():
+                    if offset >= self._start:
+                        yield offset, prompt.strip()
+                    offset += 1
+        else:
+            for prompt in self.prompts:
+                if prompt.strip():
+                    if offset >= self._start:
+                        yield offset, prompt.strip()
+                    offset += 1
+
+
+def open_prompt_source(prompts: Any) -> PromptSource:
+    """Wrap a path, iterable or existing source as a PromptSource"""
+    if isinstance(prompts, PromptSource):
+        return prompts
+    if isinstance(prompts, (str, Path)):
+        if Path(prompts).suffix.lower() == '.jsonl':
+            return JsonlPromptSource(prompts)
+        return TextFilePromptSource(prompts)
+    return IterablePromptSource(prompts)
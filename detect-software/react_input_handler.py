@@ -5,417 +5,178 @@ React Input Handler - Specialized module for handling React component interactio
 
 import asyncio
 import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from metrics import METRICS
+
+
+# Selectors the generation-started check compares against
+SUBMIT_BUTTON_SELECTOR = 'button[aria-label="Submit prompt"]'
+PROMPT_TEXTAREA_SELECTOR = 'textarea[placeholder*="Describe your idea"]'
+
+
+# Fallback click methods, in their default order
+CLICK_METHODS = [
+    ('force_enable_click', "force click"),     # Method 1: Force enable and direct click
+    ('icon_click', "icon click"),              # Method 2: Click the icon inside button
+    ('mouse_events', "mouse events"),          # Method 3: Dispatch mouse events
+    ('form_submit', "form submit"),            # Method 4: Form submission
+]
+
+
+class ClickStrategyCache:
+    """Remembers which fallback click method works on the current Whisk build
+
+    The last successful method is tried first. State is shared by every tab
+    in a session and persisted to a small JSON file between runs.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self.last_success: Optional[str] = None
+        self.wins: Dict[str, int] = {}
+        self.logger = logging.getLogger(__name__)
+        self._load()
+
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            self.last_success = data.get('last_success')
+            self.wins = {k: int(v) for k, v in data.get('wins', {}).items()}
+        except (ValueError, OSError) as e:
+            self.logger.warning(f"Ignoring unreadable click strategy cache {self.path}: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+            tmp_path.write_text(json.dumps({'last_success': self.last_success, 'wins': self.wins}), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"Failed to save click strategy cache: {e}")
+
+    def ordered(self, methods: List[tuple]) -> List[tuple]:
+        """Methods with the last winner first, then by number of past wins"""
+        default_rank = {name: i for i, (name, _) in enumerate(methods)}
+        return sorted(methods, key=lambda m: (
+            m[0] != self.last_success, -self.wins.get(m[0], 0), default_rank[m[0]]
+        ))
+
+    def record_success(self, method: str):
+        self.last_success = method
+        self.wins[method] = self.wins.get(method, 0) + 1
+        self._save()
 
 
 class ReactInputHandler:
     """Handles React-specific input interactions for Whisk"""
-    
-    def __init__(self, chrome_client, logger):
+
+    def __init__(self, chrome_client, logger, strategy_cache: ClickStrategyCache = None):
         self.chrome_client = chrome_client
+        self.helpers = chrome_client.helpers
         self.logger = logger
-    
+        self.strategy_cache = strategy_cache or ClickStrategyCache()
+
     async def fill_react_textarea(self, selector: str, text: str) -> bool:
         """Fill React textarea with proper event handling"""
-        
-        # Step 1: Find and prepare the textarea
-        prepare_script = f"""
-        (() => {{
-            const textarea = document.querySelector('{selector}');
-            if (!textarea) return {{success: false, error: 'Textarea not found'}};
-            
-            // Get React fiber node for direct state manipulation
-            const reactFiber = textarea._reactInternalFiber || 
-                              textarea._reactInternals || 
-                              Object.keys(textarea).find(key => key.startsWith('__reactInternalInstance'));
-            
-            return {{
-                success: true,
-                hasReactFiber: !!reactFiber,
-                currentValue: textarea.value,
-                placeholder: textarea.placeholder
-            }};
-        }})()
-        """
-        
-        result = await self.chrome_client.execute_javascript(prepare_script)
-        self.logger.debug(f"Textarea preparation: {result}")
-        
-        if not result or not result.get('success'):
-            return False
-        
-        # Step 2: Clear and focus with React-aware events
-        clear_script = f"""
-        (() => {{
-            const textarea = document.querySelector('{selector}');
-            if (!textarea) return false;
-            
-            // Focus first
-            textarea.focus();
-            
-            // Clear value with React-compatible method
-            const nativeInputValueSetter = Object.getOwnPropertyDescriptor(
-                window.HTMLTextAreaElement.prototype, 'value'
-            ).set;
-            
-            nativeInputValueSetter.call(textarea, '');
-            
-            // Trigger React's input event
-            const inputEvent = new Event('input', {{ bubbles: true }});
-            textarea.dispatchEvent(inputEvent);
-            
-            return true;
-        }})()
-        """
-        
-        if not await self.chrome_client.execute_javascript(clear_script):
-            self.logger.warning("Failed to clear textarea")
-            return False
-        
-        # Step 3: Set value with React-compatible method
-        set_value_script = f"""
-        (() => {{
-            const textarea = document.querySelector('{selector}');
-            if (!textarea) return false;
-            
-            const text = `{text.replace('`', '\\`').replace('\\', '\\\\')}`;
-            
-            // Use React's native input value setter
-            const nativeInputValueSetter = Object.getOwnPropertyDescriptor(
-                window.HTMLTextAreaElement.prototype, 'value'
-            ).set;
-            
-            nativeInputValueSetter.call(textarea, text);
-            
-            // Create React-compatible input event
-            const inputEvent = new Event('input', {{ 
-                bubbles: true,
-                cancelable: true 
-            }});
-            
-            // Set event properties that React expects
-            Object.defineProperty(inputEvent, 'target', {{
-                value: textarea,
-                enumerable: true
-            }});
-            
-            Object.defineProperty(inputEvent, 'currentTarget', {{
-                value: textarea,
-                enumerable: true
-            }});
-            
-            // Dispatch the event
-            textarea.dispatchEvent(inputEvent);
-            
-            return {{
-                success: true,
-                value: textarea.value,
-                length: textarea.value.length
-            }};
-        }})()
-        """
-        
-        result = await self.chrome_client.execute_javascript(set_value_script)
-        self.logger.debug(f"Set value result: {result}")
-        
-        # Step 4: Trigger additional React events
-        trigger_events_script = f"""
-        (() => {{
-            const textarea = document.querySelector('{selector}');
-            if (!textarea) return false;
-            
-            // Trigger comprehensive event sequence for React
-            const events = [
-                new Event('change', {{ bubbles: true }}),
-                new Event('blur', {{ bubbles: true }}),
-                new Event('focusout', {{ bubbles: true }})
-            ];
-            
-            events.forEach(event => {{
-                Object.defineProperty(event, 'target', {{
-                    value: textarea,
-                    enumerable: true
-                }});
-                textarea.dispatchEvent(event);
-            }});
-            
-            // Re-focus to ensure state is updated
-            textarea.focus();
-            
-            // Trigger one more input event after a brief delay
-            setTimeout(() => {{
-                const finalInputEvent = new Event('input', {{ bubbles: true }});
-                Object.defineProperty(finalInputEvent, 'target', {{
-                    value: textarea,
-                    enumerable: true
-                }});
-                textarea.dispatchEvent(finalInputEvent);
-            }}, 100);
-            
-            return true;
-        }})()
+
+        # The page helper sets the value through React's native setter and
+        # resolves once its trailing input event has been dispatched
+        result = await self.helpers.call('fill', self.helpers.element(selector), text)
+        self.logger.debug(f"Fill result: {result}")
+
+        return bool(result and result.get('success'))
+
+    async def fill_native(self, selector: str, text: str, button_selector: str, timeout: int = 15) -> bool:
+        """Type text as real input with Input.insertText and wait for the button
+
+        React sees the insertion as genuine user input, so no synthetic events
+        or settle delay are needed. Returns True once the button is enabled;
+        raises if the textarea is missing, since nothing was typed.
         """
-        
-        await self.chrome_client.execute_javascript(trigger_events_script)
-        
-        # Step 5: Wait for React to process the events
-        await asyncio.sleep(1)
-        
-        return True
-    
+
+        # Focus and select the current value so the insertion replaces it
+        if not await self.helpers.call('focusForInput', self.helpers.element(selector)):
+            raise Exception("Textarea not found for native input")
+
+        # Not resent after a reconnect: the text could be inserted twice. The
+        # attempt fails instead, and the next one selects and replaces the value
+        await self.chrome_client._send_command("Input.insertText", {"text": text}, resend=False)
+
+        return await self.wait_for_button_enabled_advanced(button_selector, timeout)
+
     async def wait_for_button_enabled_advanced(self, selector: str, timeout: int = 15) -> bool:
         """Advanced button state monitoring with React-specific checks"""
-        
+
         self.logger.info(f"Waiting for button to be enabled (timeout: {timeout}s)")
-        
-        for i in range(timeout * 4):  # Check every 0.25 seconds
-            check_script = f"""
-            (() => {{
-                const button = document.querySelector('{selector}');
-                if (!button) return {{found: false}};
-                
-                // Check multiple button state indicators
-                const isDisabled = button.disabled;
-                const hasDisabledAttr = button.hasAttribute('disabled');
-                const disabledAttrValue = button.getAttribute('disabled');
-                const isVisible = button.offsetParent !== null;
-                const computedStyle = window.getComputedStyle(button);
-                
-                // Check if button is in a form and form validation state
-                const form = button.closest('form');
-                const formValid = form ? form.checkValidity() : true;
-                
-                // Check textarea state
-                const textarea = document.querySelector('textarea[placeholder*="Describe your idea"]');
-                const textareaValue = textarea ? textarea.value : '';
-                const textareaLength = textareaValue.length;
-                
-                return {{
-                    found: true,
-                    disabled: isDisabled,
-                    hasDisabledAttr: hasDisabledAttr,
-                    disabledAttrValue: disabledAttrValue,
-                    visible: isVisible,
-                    clickable: !isDisabled && isVisible,
-                    opacity: computedStyle.opacity,
-                    pointerEvents: computedStyle.pointerEvents,
-                    formValid: formValid,
-                    textareaLength: textareaLength,
-                    textareaValue: textareaValue.substring(0, 50) + (textareaValue.length > 50 ? '...' : '')
-                }};
-            }})()
-            """
-            
-            result = await self.chrome_client.execute_javascript(check_script)
-            
-            if result and result.get('clickable'):
-                self.logger.info(f"✅ Button enabled after {i * 0.25:.2f} seconds")
-                return True
-            
-            # Log detailed state every 2 seconds
-            if i % 8 == 0:
-                self.logger.debug(f"Button state at {i * 0.25:.2f}s: {result}")
-            
-            await asyncio.sleep(0.25)
-        
+
+        # Resolves inside the page as soon as the (cached) button becomes clickable
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await self.helpers.wait('buttonReady', timeout, self.helpers.element(selector), selector)
+
+        if result and result.get('clickable'):
+            self.logger.info(f"✅ Button enabled after {loop.time() - started:.2f} seconds")
+            return True
+
+        self.logger.debug(f"Button state after {timeout}s: {await self._button_state(selector)}")
         self.logger.warning(f"❌ Button not enabled after {timeout} seconds")
         return False
-    
-    async def force_enable_and_click(self, selector: str) -> bool:
-        """Force enable button and attempt click with multiple methods"""
-        
-        self.logger.info("Attempting to force enable and click button")
-        
-        # Method 1: Force enable and direct click
-        force_click_script = f"""
-        (() => {{
-            const button = document.querySelector('{selector}');
-            if (!button) return {{success: false, error: 'Button not found'}};
-            
-            // Force enable the button
-            button.disabled = false;
-            button.removeAttribute('disabled');
-            
-            // Direct click
-            button.click();
-            
-            return {{
-                success: true,
-                method: 'force_enable_click',
-                buttonState: {{
-                    disabled: button.disabled,
-                    hasDisabledAttr: button.hasAttribute('disabled')
-                }}
-            }};
-        }})()
-        """
-        
-        result = await self.chrome_client.execute_javascript(force_click_script)
-        self.logger.debug(f"Force click result: {result}")
-        
-        # Wait and check for changes
-        await asyncio.sleep(2)
-        
-        # Check if generation started
-        if await self._check_generation_started():
-            self.logger.info("✅ Generation started with force click method")
-            return True
-        
-        # Method 2: Click the icon inside button
-        icon_click_script = f"""
-        (() => {{
-            const icon = document.querySelector('{selector} i.google-symbols');
-            if (!icon) return {{success: false, error: 'Icon not found'}};
-            
-            // Enable parent button first
-            const button = icon.closest('button');
-            if (button) {{
-                button.disabled = false;
-                button.removeAttribute('disabled');
-            }}
-            
-            // Click the icon
-            icon.click();
-            
-            return {{success: true, method: 'icon_click'}};
-        }})()
-        """
-        
-        result = await self.chrome_client.execute_javascript(icon_click_script)
-        self.logger.debug(f"Icon click result: {result}")
-        
-        await asyncio.sleep(2)
-        
-        if await self._check_generation_started():
-            self.logger.info("✅ Generation started with icon click method")
-            return True
-        
-        # Method 3: Dispatch mouse events
-        mouse_events_script = f"""
-        (() => {{
-            const button = document.querySelector('{selector}');
-            if (!button) return {{success: false, error: 'Button not found'}};
-            
-            // Force enable
-            button.disabled = false;
-            button.removeAttribute('disabled');
-            
-            // Create and dispatch mouse events
-            const rect = button.getBoundingClientRect();
-            const centerX = rect.left + rect.width / 2;
-            const centerY = rect.top + rect.height / 2;
-            
-            const mouseEvents = [
-                new MouseEvent('mousedown', {{
-                    bubbles: true,
-                    cancelable: true,
-                    clientX: centerX,
-                    clientY: centerY
-                }}),
-                new MouseEvent('mouseup', {{
-                    bubbles: true,
-                    cancelable: true,
-                    clientX: centerX,
-                    clientY: centerY
-                }}),
-                new MouseEvent('click', {{
-                    bubbles: true,
-                    cancelable: true,
-                    clientX: centerX,
-                    clientY: centerY
-                }})
-            ];
-            
-            mouseEvents.forEach(event => button.dispatchEvent(event));
-            
-            return {{success: true, method: 'mouse_events'}};
-        }})()
-        """
-        
-        result = await self.chrome_client.execute_javascript(mouse_events_script)
-        self.logger.debug(f"Mouse events result: {result}")
-        
-        await asyncio.sleep(2)
-        
-        if await self._check_generation_started():
-            self.logger.info("✅ Generation started with mouse events method")
-            return True
-        
-        # Method 4: Form submission
-        form_submit_script = f"""
-        (() => {{
-            const button = document.querySelector('{selector}');
-            if (!button) return {{success: false, error: 'Button not found'}};
-            
-            const form = button.closest('form');
-            if (form) {{
-                // Try form submission
-                form.submit();
-                return {{success: true, method: 'form_submit'}};
-            }} else {{
-                // Try dispatching submit event on button
-                button.dispatchEvent(new Event('submit', {{bubbles: true}}));
-                return {{success: true, method: 'submit_event'}};
-            }}
-        }})()
+
+    async def _button_state(self, selector: str) -> dict:
+        """Detailed button and textarea state, for diagnostics"""
+        return await self.helpers.call('snapshot', self.helpers.element(selector), PROMPT_TEXTAREA_SELECTOR)
+
+    async def force_enable_and_click(self, selector: str, check_timeout: float = 2) -> bool:
+        """Force enable button and attempt click with multiple methods
+
+        Methods are tried in the order learned by the strategy cache; after
+        each one the page is watched until generation starts (at most
+        check_timeout seconds) rather than sleeping a fixed time.
         """
-        
-        result = await self.chrome_client.execute_javascript(form_submit_script)
-        self.logger.debug(f"Form submit result: {result}")
-        
-        await asyncio.sleep(2)
-        
-        if await self._check_generation_started():
-            self.logger.info("✅ Generation started with form submit method")
-            return True
-        
+
+        self.logger.info("Attempting to force enable and click button")
+
+        for method, label in self.strategy_cache.ordered(CLICK_METHODS):
+            METRICS.inc("click_fallbacks", method=method)
+            result = await self.helpers.call('forceClick', self.helpers.element(selector), method, resend=False)
+            self.logger.debug(f"{label.capitalize()} result: {result}")
+
+            # Check if generation started
+            if await self._wait_for_generation_started(check_timeout):
+                self.logger.info(f"✅ Generation started with {label} method")
+                METRICS.inc("click_fallback_successes", method=method)
+                self.strategy_cache.record_success(method)
+                return True
+
         self.logger.error("❌ All click methods failed")
         return False
-    
-    async def _check_generation_started(self) -> bool:
-        """Check if generation process has started"""
-        
-        check_script = """
-        (() => {
-            // Check for loading indicators
-            const loadingSelectors = [
-                '.loading',
-                '.spinner', 
-                '[data-loading="true"]',
-                '.generating',
-                '.progress',
-                '[aria-busy="true"]'
-            ];
-            
-            const hasLoading = loadingSelectors.some(selector => 
-                document.querySelectorAll(selector).length > 0
-            );
-            
-            // Check if button disappeared or changed
-            const submitButton = document.querySelector('button[aria-label="Submit prompt"]');
-            const buttonChanged = !submitButton || submitButton.textContent !== 'arrow_forward';
-            
-            // Check if textarea was cleared or disabled
-            const textarea = document.querySelector('textarea[placeholder*="Describe your idea"]');
-            const textareaChanged = !textarea || textarea.disabled || textarea.value === '';
-            
-            // Check URL changes
-            const urlChanged = window.location.href.includes('generating') || 
-                              window.location.href.includes('result');
-            
-            return {
-                hasLoading: hasLoading,
-                buttonChanged: buttonChanged,
-                textareaChanged: textareaChanged,
-                urlChanged: urlChanged,
-                generationStarted: hasLoading || buttonChanged || urlChanged
-            };
-        })()
-        """
-        
-        result = await self.chrome_client.execute_javascript(check_script)
-        
-        if result and result.get('generationStarted'):
+
+    async def submission_started(self, timeout: float = 2) -> bool:
+        """Whether a submit whose reply was lost actually started a generation"""
+        try:
+            return await self._wait_for_generation_started(timeout)
+        except Exception as e:
+            self.logger.warning(f"Could not check whether generation started: {e}")
+            return False
+
+    async def _wait_for_generation_started(self, timeout: float) -> bool:
+        """Wait in the page until generation has started"""
+
+        result = await self.helpers.wait(
+            'generationStarted', timeout,
+            self.helpers.element(SUBMIT_BUTTON_SELECTOR), SUBMIT_BUTTON_SELECTOR,
+            self.helpers.element(PROMPT_TEXTAREA_SELECTOR), PROMPT_TEXTAREA_SELECTOR
+        )
+
+        if result:
             self.logger.debug(f"Generation indicators: {result}")
             return True
-        
+
         return False
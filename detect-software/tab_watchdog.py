@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tab Watchdog - Decide when a long-lived Whisk tab should be recycled
+
+Every generation leaves result images in the DOM and the tab's JS heap keeps
+growing, which slows every poll and eventually crashes the renderer. The
+watchdog samples Performance.getMetrics between prompts. Past a share of the
+limits it asks for a standby tab to be loaded in the background; past the
+limits it asks for the swap, which the automator performs at the prompt
+boundary.
+"""
+
+import logging
+from typing import Dict
+
+
+TAB_OK = "ok"
+TAB_PREWARM = "prewarm"
+TAB_RECYCLE = "recycle"
+
+
+class TabMemoryWatchdog:
+    """Compares a tab's JS heap and DOM node count against recycling limits"""
+
+    def __init__(self, heap_limit_mb: float = 1024, node_limit: int = 200000,
+                 prewarm_ratio: float = 0.75, logger: logging.Logger = None):
+        self.heap_limit = heap_limit_mb * 1024 * 1024
+        self.node_limit = node_limit
+        self.prewarm_ratio = prewarm_ratio
+        self.logger = logger or logging.getLogger(__name__)
+        self.last: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.heap_limit > 0 or self.node_limit > 0
+
+    def _usage(self, metrics: Dict[str, float]) -> float:
+        """Highest fraction of a limit the tab has reached"""
+        ratios = []
+        if self.heap_limit > 0:
+            ratios.append(metrics.get('JSHeapUsedSize', 0) / self.heap_limit)
+        if self.node_limit > 0:
+            ratios.append(metrics.get('Nodes', 0) / self.node_limit)
+        return max(ratios, default=0.0)
+
+    def describe(self, name: str) -> str:
+        metrics = self.last.get(name, {})
+        return (f"heap {metrics.get('JSHeapUsedSize', 0) / 1024 / 1024:.0f} MB, "
+                f"{int(metrics.get('Nodes', 0))} DOM nodes")
+
+    async def check(self, name: str, chrome_client) -> str:
+        """Sample the tab and return TAB_OK, TAB_PREWARM or TAB_RECYCLE"""
+        try:
+            metrics = await chrome_client.performance_metrics()
+        except Exception as e:
+            self.logger.debug(f"[{name}] Memory sample failed: {e}")
+            return TAB_OK
+
+        self.last[name] = metrics
+        usage = self._usage(metrics)
+        if usage >= 1:
+            return TAB_RECYCLE
+        if usage >= self.prewarm_ratio:
+            return TAB_PREWARM
+        return TAB_OK
@@ -5,14 +5,16 @@ Launcher siêu đơn giản - không hỏi gì cả, chạy thẳng với config
 """
 
 import asyncio
-import subprocess
 import sys
-import os
-import time
-import platform
 from pathlib import Path
 
 
+REQUIRED_FILES = ["whisk_session_takeover.py", "react_input_handler.py", "prompts.txt"]
+
+# Chờ người dùng đăng nhập Google tối đa 5 phút
+LOGIN_TIMEOUT = 300
+
+
 def print_header():
     """In header của tool"""
     print("=" * 60)
@@ -22,177 +24,181 @@ def print_header():
     print("=" * 60)
 
 
-def start_chrome():
-    """Khởi động Chrome với debug mode"""
+def check_files():
+    """Kiểm tra các file cần thiết"""
+    missing_files = [f for f in REQUIRED_FILES if not Path(f).exists()]
+    if missing_files:
+        print(f"❌ Thiếu files: {', '.join(missing_files)}")
+        return False
+    print("✅ Files OK")
+    return True
+
+
+async def start_chrome():
+    """Khởi động Chrome với debug mode (profile cố định, chờ tới khi DevTools sẵn sàng)"""
     print("\n🌐 KHỞI ĐỘNG CHROME...")
-    
-    system = platform.system()
-    
+
     try:
-        if system == "Windows":
-            chrome_paths = [
-                "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
-                "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe",
-                os.path.expanduser("~\\AppData\\Local\\Google\\Chrome\\Application\\chrome.exe")
-            ]
-            
-            chrome_path = None
-            for path in chrome_paths:
-                if os.path.exists(path):
-                    chrome_path = path
-                    break
-            
-            if not chrome_path:
-                print("❌ Không tìm thấy Chrome!")
-                return False
-            
-            temp_dir = os.path.join(os.environ.get('TEMP', ''), f'chrome-debug-{int(time.time())}')
-            cmd = [chrome_path, "--remote-debugging-port=9222", f"--user-data-dir={temp_dir}"]
-            
-        else:  # macOS/Linux
-            if system == "Darwin":
-                chrome_path = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
-            else:
-                chrome_paths = ["/usr/bin/google-chrome", "/usr/bin/google-chrome-stable", "/usr/bin/chromium-browser"]
-                chrome_path = None
-                for path in chrome_paths:
-                    if os.path.exists(path):
-                        chrome_path = path
-                        break
-            
-            if not chrome_path or not os.path.exists(chrome_path):
-                print("❌ Không tìm thấy Chrome!")
-                return False
-            
-            temp_dir = f"/tmp/chrome-debug-{int(time.time())}"
-            cmd = [chrome_path, "--remote-debugging-port=9222", f"--user-data-dir={temp_dir}"]
-        
-        subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        from browser_pool import BrowserPool
+
+        if not await BrowserPool(1).start(supervise=False):
+            print("❌ Không tìm thấy hoặc không khởi động được Chrome!")
+            return False
+
         print("✅ Chrome đã khởi động với debug mode")
-        time.sleep(3)
         return True
-        
+
     except Exception as e:
         print(f"❌ Lỗi khởi động Chrome: {e}")
         return False
 
 
-def setup_user():
-    """Hướng dẫn user setup ngắn gọn"""
-    print("\n" + "=" * 60)
-    print("📋 THIẾT LẬP NHANH")
-    print("=" * 60)
-    print("✅ Chrome đã mở với debug mode")
-    print("\n🔥 VUI LÒNG:")
-    print("1. Đăng nhập Google trong Chrome")
-    print("2. Vào: https://labs.google/fx/tools/whisk")
-    print("3. Đảm bảo thấy giao diện tạo design")
-    print("=" * 60)
-    
-    input("\n🚀 Nhấn Enter khi đã vào Whisk...")
+async def wait_for_whisk(port=9222, timeout=LOGIN_TIMEOUT):
+    """Tìm (hoặc mở) tab Whisk và chờ tới khi thấy ô nhập prompt, tức là đã đăng nhập"""
+    from browser_pool import WHISK_URL
+    from react_input_handler import PROMPT_TEXTAREA_SELECTOR
+    from whisk_session_takeover import ChromeDevToolsClient
+
+    client = ChromeDevToolsClient(port)
+    tabs = await client.find_whisk_tabs()
+    target = tabs[0] if tabs else await client.create_tab(WHISK_URL)
+    if not await client.connect(target):
+        print("❌ Không kết nối được tab Whisk")
+        return False
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    asked_login = False
+    try:
+        while loop.time() < deadline:
+            try:
+                if await client.wait_for_element(PROMPT_TEXTAREA_SELECTOR, timeout=5):
+                    print("✅ Whisk đã sẵn sàng")
+                    return True
+            except Exception:
+                # Trang đang chuyển hướng (ví dụ sang trang đăng nhập Google)
+                await asyncio.sleep(1)
+
+            if not asked_login:
+                asked_login = True
+                print("\n🔐 VUI LÒNG ĐĂNG NHẬP GOOGLE trong cửa sổ Chrome vừa mở")
+                print("   Tool sẽ tự chạy ngay khi thấy giao diện tạo design của Whisk")
+
+        print("❌ Hết thời gian chờ đăng nhập Whisk")
+        return False
+    finally:
+        await client.close()
 
 
 def check_prompts_quick():
-    """Kiểm tra prompts nhanh"""
+    """Kiểm tra prompts nhanh (trả về nguồn prompts đã đánh chỉ mục, hoặc None)"""
     print("\n📝 KIỂM TRA PROMPTS...")
-    
+
     if not Path("prompts.txt").exists():
         print("❌ Không tìm thấy prompts.txt")
-        return False
-    
-    with open("prompts.txt", "r", encoding="utf-8") as f:
-        prompts = [line.strip() for line in f if line.strip()]
-    
-    print(f"📊 Sẵn sàng xử lý {len(prompts)} prompts")
-    return len(prompts) > 0
+        return None
 
+    # Chỉ mục dòng được dùng lại khi chạy automation, không đọc file lần nữa
+    from prompt_source import TextFilePromptSource
+    source = TextFilePromptSource("prompts.txt")
+    total = source.count()
 
-async def run_automation_direct():
+    print(f"📊 Sẵn sàng xử lý {total} prompts")
+    return source if total > 0 else None
+
+
+async def run_automation_direct(prompt_source=None):
     """Chạy automation với config mặc định"""
     try:
         from whisk_session_takeover import WhiskAutomator, WhiskConfig, setup_logging
-        
+
         # Config mặc định
         setup_logging("INFO")
-        
+
         config = WhiskConfig(
             generation_delay=20,
             retry_attempts=3,
             prompts_file="prompts.txt",
             log_level="INFO"
         )
-        
+
         # Chạy automation
-        automator = WhiskAutomator(config)
+        automator = WhiskAutomator(config, prompt_source)
         success = await automator.run()
-        
+
         return success
-        
+
     except Exception as e:
         print(f"❌ Lỗi automation: {e}")
         return False
 
 
-def main():
-    """Main function"""
-    print_header()
-    
-    # Kiểm tra files nhanh
-    required_files = ["whisk_session_takeover.py", "react_input_handler.py", "prompts.txt"]
-    missing_files = [f for f in required_files if not Path(f).exists()]
-    
-    if missing_files:
-        print(f"❌ Thiếu files: {', '.join(missing_files)}")
-        input("Nhấn Enter để thoát...")
-        sys.exit(1)
-    
-    print("✅ Files OK")
-    
-    # Khởi động Chrome
-    if not start_chrome():
-        input("Nhấn Enter để thoát...")
-        sys.exit(1)
-    
-    # Setup user nhanh
-    setup_user()
-    
-    # Kiểm tra prompts nhanh
-    if not check_prompts_quick():
-        input("Nhấn Enter để thoát...")
-        sys.exit(1)
-    
+async def bootstrap():
+    """Kiểm tra file, đếm prompts và khởi động Chrome cùng lúc, rồi chờ Whisk sẵn sàng
+
+    Trả về nguồn prompts, hoặc None nếu có bước nào thất bại.
+    """
+    files_ok, prompt_source, chrome_ok = await asyncio.gather(
+        asyncio.to_thread(check_files),
+        asyncio.to_thread(check_prompts_quick),
+        start_chrome()
+    )
+    if not (files_ok and prompt_source and chrome_ok):
+        return None
+
+    if not await wait_for_whisk():
+        return None
+    return prompt_source
+
+
+async def bootstrap_and_run():
+    """Chạy automation ngay khi Whisk dùng được, trong cùng một event loop
+
+    Trả về None nếu khởi động thất bại.
+    """
+    prompt_source = await bootstrap()
+    if not prompt_source:
+        return None
+
     # Hiển thị config mặc định
     print("\n⚙️ CẤU HÌNH MẶC ĐỊNH:")
     print("   • Delay: 20 giây")
     print("   • Debug: Tắt")
     print("   • Retries: 3 lần")
-    
-    input("\n🎯 Nhấn Enter để bắt đầu automation...")
-    
-    # Chạy automation
+
     print("\n🎯 BẮT ĐẦU AUTOMATION...")
     print("=" * 40)
     print("📊 Đang xử lý prompts...")
     print("⏹️ Nhấn Ctrl+C để dừng")
     print()
-    
+
+    return await run_automation_direct(prompt_source)
+
+
+def main():
+    """Main function"""
+    print_header()
+
     try:
-        success = asyncio.run(run_automation_direct())
-        
-        if success:
+        success = asyncio.run(bootstrap_and_run())
+
+        if success is None:
+            input("Nhấn Enter để thoát...")
+            sys.exit(1)
+        elif success:
             print("\n🎉 AUTOMATION HOÀN THÀNH!")
             print("✅ Tất cả prompts đã được xử lý")
             print("📁 Kiểm tra kết quả trong Whisk")
         else:
             print("\n⚠️ AUTOMATION HOÀN THÀNH VỚI MỘT SỐ LỖI")
             print("📋 Một số prompts có thể không thành công")
-            
+
     except KeyboardInterrupt:
         print("\n⏹️ DỪNG BỞI USER")
-        
+
     except Exception as e:
         print(f"\n❌ LỖI: {e}")
-    
+
     print("\n" + "=" * 60)
     print("🏁 HOÀN TẤT!")
     print("=" * 60)
@@ -8,11 +8,10 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 import threading
 import asyncio
+import logging
+import queue
 import sys
 import os
-import subprocess
-import platform
-import time
 from pathlib import Path
 try:
     from PIL import Image, ImageTk
@@ -21,6 +20,72 @@ except ImportError:
     PIL_AVAILABLE = False
 
 
+class QueueLogHandler(logging.Handler):
+    """Logging handler an toàn cho mọi thread: chỉ đẩy record vào queue, không chạm Tk"""
+
+    def __init__(self, records: "queue.SimpleQueue"):
+        super().__init__()
+        self.records = records
+
+    def emit(self, record):
+        self.records.put(record)
+
+
+class LogPump:
+    """Drain log records vào Text widget theo lô trên main loop của Tk
+
+    Widget chỉ giữ max_lines dòng gần nhất; toàn bộ lịch sử được ghi ra
+    history_file để xem lại sau một đêm chạy.
+    """
+
+    def __init__(self, root, text_widget, history_file: str = "whisk_gui_history.log",
+                 max_lines: int = 2000, interval_ms: int = 100, batch_size: int = 500):
+        self.root = root
+        self.text = text_widget
+        self.history_file = history_file
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self.batch_size = batch_size
+        self.records = queue.SimpleQueue()
+        self.handler = QueueLogHandler(self.records)
+        self.handler.setFormatter(logging.Formatter('[%(asctime)s] %(message)s', datefmt='%H:%M:%S'))
+
+    def start(self):
+        """Gắn handler vào root logger và bắt đầu drain định kỳ"""
+        logging.getLogger().addHandler(self.handler)
+        self.root.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        logging.getLogger().removeHandler(self.handler)
+
+    def _drain(self):
+        lines = []
+        try:
+            while len(lines) < self.batch_size:
+                lines.append(self.handler.format(self.records.get_nowait()))
+        except queue.Empty:
+            pass
+
+        if lines:
+            text = "\n".join(lines) + "\n"
+            self._spill(text)
+            self.text.insert(tk.END, text)
+            # Giữ widget trong giới hạn: xoá các dòng cũ nhất
+            excess = int(self.text.index('end-1c').split('.')[0]) - 1 - self.max_lines
+            if excess > 0:
+                self.text.delete('1.0', f'{excess + 1}.0')
+            self.text.see(tk.END)
+
+        self.root.after(self.interval_ms, self._drain)
+
+    def _spill(self, text: str):
+        try:
+            with open(self.history_file, "a", encoding="utf-8") as f:
+                f.write(text)
+        except OSError:
+            pass
+
+
 class WhiskGUI:
     def __init__(self, root):
         self.root = root
@@ -41,8 +106,23 @@ class WhiskGUI:
         self.is_running = False
         self.chrome_started = False
 
+        # Một event loop sống suốt phiên: giữ kết nối tới tab Whisk giữa các lần chạy
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self._run_loop, daemon=True).start()
+        self.automator = None
+        self.current_job = None
+        self.job_task = None
+        self.browser_pool = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Log từ mọi thread đi qua queue, Tk drain theo lô
+        self.logger = logging.getLogger("whisk_gui")
+        self.logger.setLevel(logging.INFO)
+
         # Setup GUI
         self.setup_gui()
+        self.log_pump = LogPump(self.root, self.log_text)
+        self.log_pump.start()
         self.load_prompts()
 
     def setup_style(self):
@@ -234,11 +314,8 @@ class WhiskGUI:
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
     def log(self, message):
-        """Thêm message vào log"""
-        timestamp = time.strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        """Thêm message vào log (an toàn khi gọi từ thread khác)"""
+        self.logger.info(message)
         
     def load_prompts(self):
         """Tải prompts từ file"""
@@ -283,75 +360,55 @@ class WhiskGUI:
             self.log(f"❌ Lỗi tải file: {e}")
             
     def start_chrome(self):
-        """Khởi động Chrome với debug mode"""
-        def run_chrome():
-            try:
-                self.log("🌐 Đang khởi động Chrome...")
-                
-                system = platform.system()
-                if system == "Windows":
-                    chrome_paths = [
-                        "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
-                        "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe",
-                        os.path.expanduser("~\\AppData\\Local\\Google\\Chrome\\Application\\chrome.exe")
-                    ]
-                    
-                    chrome_path = None
-                    for path in chrome_paths:
-                        if os.path.exists(path):
-                            chrome_path = path
-                            break
-                    
-                    if not chrome_path:
-                        self.log("❌ Không tìm thấy Chrome!")
-                        return
-                    
-                    temp_dir = os.path.join(os.environ.get('TEMP', ''), f'chrome-debug-{int(time.time())}')
-                    cmd = [chrome_path, "--remote-debugging-port=9222", f"--user-data-dir={temp_dir}"]
-                    
-                else:  # macOS/Linux
-                    if system == "Darwin":
-                        chrome_path = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
-                    else:
-                        chrome_paths = ["/usr/bin/google-chrome", "/usr/bin/google-chrome-stable"]
-                        chrome_path = None
-                        for path in chrome_paths:
-                            if os.path.exists(path):
-                                chrome_path = path
-                                break
-                    
-                    if not chrome_path or not os.path.exists(chrome_path):
-                        self.log("❌ Không tìm thấy Chrome!")
-                        return
-                    
-                    temp_dir = f"/tmp/chrome-debug-{int(time.time())}"
-                    cmd = [chrome_path, "--remote-debugging-port=9222", f"--user-data-dir={temp_dir}"]
-                
-                subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                
-                self.chrome_started = True
-                self.chrome_status.config(text="✅ Đã khởi động", style='Success.TLabel')
-                self.start_automation_btn.config(state="normal")
-                self.log("✅ Chrome đã khởi động với debug mode")
-                self.log("📋 Vui lòng:")
-                self.log("   1. Đăng nhập Google trong Chrome")
-                self.log("   2. Truy cập: https://labs.google/fx/tools/whisk")
-                self.log("   3. Đảm bảo thấy giao diện tạo design")
-                
-            except Exception as e:
-                self.log(f"❌ Lỗi khởi động Chrome: {e}")
+        """Khởi động Chrome với debug mode (profile cố định, được giám sát và tự khởi động lại)"""
+        from browser_pool import BrowserPool
+        
+        self.log("🌐 Đang khởi động Chrome...")
+        self.start_chrome_btn.config(state="disabled")
+        if self.browser_pool is None:
+            self.browser_pool = BrowserPool(1)
+            self.browser_pool.on_restart(self._chrome_restarted)
+        future = asyncio.run_coroutine_threadsafe(self.browser_pool.start(), self.loop)
+        self._when_done(future, self._chrome_started)
+
+    def _chrome_started(self, future):
+        self.start_chrome_btn.config(state="normal")
+        if future.exception() or not future.result():
+            self.log(f"❌ Lỗi khởi động Chrome: {future.exception() or 'không tìm thấy Chrome hoặc Chrome không phản hồi'}")
+            return
         
-        threading.Thread(target=run_chrome, daemon=True).start()
+        self.chrome_started = True
+        self.chrome_status.config(text="✅ Đã khởi động", style='Success.TLabel')
+        self.start_automation_btn.config(state="normal")
+        self.log("✅ Chrome đã khởi động với debug mode")
+        self.log("📋 Vui lòng:")
+        self.log("   1. Đăng nhập Google trong Chrome (chỉ cần lần đầu, profile được giữ lại)")
+        self.log("   2. Truy cập: https://labs.google/fx/tools/whisk")
+        self.log("   3. Đảm bảo thấy giao diện tạo design")
+
+    async def _chrome_restarted(self, port):
+        """Chrome bị crash và vừa được khởi động lại: mở lại tab Whisk cho automator"""
+        if self.automator:
+            await self.automator.reattach(port)
+
+    def _when_done(self, future, callback):
+        """Gọi callback(future) trên main thread của Tk khi future xong"""
+        if future.done():
+            callback(future)
+        else:
+            self.root.after(200, self._when_done, future, callback)
         
+    def _run_loop(self):
+        """Thread chạy event loop dùng chung cho mọi job automation"""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
     def start_automation(self):
         """Bắt đầu automation"""
         if self.is_running:
             return
             
-        # Lưu prompts trước khi chạy
-        self.save_prompts_file()
-        
-        # Kiểm tra prompts
+        # Kiểm tra prompts (truyền thẳng cho automator, không cần ghi ra file)
         content = self.prompts_text.get(1.0, tk.END).strip()
         prompts = [line.strip() for line in content.split('\n') if line.strip() and not line.strip().startswith('#')]
         
@@ -361,63 +418,111 @@ class WhiskGUI:
         
         self.log(f"📊 Sẵn sàng xử lý {len(prompts)} prompts")
         
-        def run_automation():
-            try:
-                self.is_running = True
-                self.start_automation_btn.config(state="disabled")
-                self.stop_btn.config(state="normal")
-                
-                # Import và chạy automation
-                from whisk_session_takeover import WhiskAutomator, WhiskConfig, setup_logging
-                
-                # Setup logging
-                log_level = "DEBUG" if self.debug_var.get() else "INFO"
-                setup_logging(log_level)
-                
-                # Tạo config
-                config = WhiskConfig(
-                    generation_delay=int(self.delay_var.get()),
-                    retry_attempts=3,
-                    prompts_file="prompts.txt",
-                    log_level=log_level
-                )
-                
-                # Chạy automation
-                async def run_async():
-                    automator = WhiskAutomator(config)
-                    success = await automator.run()
-                    return success
-                
-                # Chạy async
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                success = loop.run_until_complete(run_async())
-                loop.close()
-                
-                if success:
-                    self.log("🎉 Automation hoàn thành thành công!")
-                    messagebox.showinfo("Thành công", "Automation đã hoàn thành!\nKiểm tra kết quả trong Whisk.")
-                else:
-                    self.log("⚠️ Automation hoàn thành với một số lỗi")
-                    messagebox.showwarning("Cảnh báo", "Automation hoàn thành nhưng có một số lỗi.\nKiểm tra log để biết chi tiết.")
-                
-            except Exception as e:
-                self.log(f"❌ Lỗi automation: {e}")
-                messagebox.showerror("Lỗi", f"Lỗi automation: {e}")
-            finally:
-                self.is_running = False
-                self.start_automation_btn.config(state="normal")
-                self.stop_btn.config(state="disabled")
+        from whisk_session_takeover import WhiskAutomator, WhiskConfig, setup_logging
         
-        threading.Thread(target=run_automation, daemon=True).start()
+        # Setup logging (gọi lại nhiều lần không nhân đôi handler)
+        log_level = "DEBUG" if self.debug_var.get() else "INFO"
+        setup_logging(log_level)
         
-    def stop_automation(self):
-        """Dừng automation"""
+        # Tạo config
+        config = WhiskConfig(
+            generation_delay=int(self.delay_var.get()),
+            retry_attempts=3,
+            log_level=log_level
+        )
+        
+        async def run_job():
+            self.job_task = asyncio.current_task()
+            if self.automator is not None and not self.automator.can_reuse(config):
+                # Journal, click cache, watchdog và kết nối tab được tạo từ cấu hình cũ
+                await self.automator.close()
+                self.automator = None
+            # Dùng lại automator (và kết nối tab) của lần chạy trước nếu còn sống
+            if self.automator is None:
+                self.automator = WhiskAutomator(config)
+            else:
+                self.automator.config = config
+            if not await self.automator.ensure_ready():
+                raise Exception("Không kết nối được tab Whisk")
+            return await self.automator.run_batch(prompts)
+        
+        self.is_running = True
+        self.start_automation_btn.config(state="disabled")
+        self.stop_btn.config(state="normal")
+        self.current_job = asyncio.run_coroutine_threadsafe(run_job(), self.loop)
+        self.root.after(200, self._check_job)
+
+    def _check_job(self):
+        """Theo dõi job trên main thread của Tk cho tới khi xong"""
+        job = self.current_job
+        if job is None:
+            return
+        if not job.done():
+            self.root.after(200, self._check_job)
+            return
+        
+        self.current_job = None
         self.is_running = False
         self.start_automation_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
+        
+        if job.cancelled():
+            return
+        
+        error = job.exception()
+        if error:
+            self.log(f"❌ Lỗi automation: {error}")
+            messagebox.showerror("Lỗi", f"Lỗi automation: {error}")
+            return
+        
+        self.whisk_status.config(text="✅ Đã kết nối", style='Success.TLabel')
+        if job.result():
+            self.log("🎉 Automation hoàn thành thành công!")
+            messagebox.showinfo("Thành công", "Automation đã hoàn thành!\nKiểm tra kết quả trong Whisk.")
+        else:
+            self.log("⚠️ Automation hoàn thành với một số lỗi")
+            messagebox.showwarning("Cảnh báo", "Automation hoàn thành nhưng có một số lỗi.\nKiểm tra log để biết chi tiết.")
+        
+    def stop_automation(self):
+        """Dừng automation"""
+        if self.current_job:
+            # Huỷ task ngay trên event loop; kết nối tab vẫn được giữ cho lần sau
+            self.current_job.cancel()
         self.log("⏹️ Đã dừng automation")
 
+    def on_close(self):
+        """Đóng kết nối Chrome và event loop trước khi thoát
+
+        Việc dọn dẹp chạy tuần tự trên event loop; cửa sổ ẩn ngay và Tk
+        không bị chặn trong lúc chờ.
+        """
+        async def shutdown():
+            if self.job_task and not self.job_task.done():
+                # Chờ job dừng hẳn trước khi đóng kết nối nó đang dùng
+                self.job_task.cancel()
+                await asyncio.gather(self.job_task, return_exceptions=True)
+            if self.automator:
+                await self.automator.close()
+            if self.browser_pool:
+                # Chrome vẫn mở để giữ kết quả; chỉ dừng giám sát
+                await self.browser_pool.stop()
+
+        async def shutdown_with_timeout():
+            try:
+                await asyncio.wait_for(shutdown(), timeout=10)
+            except Exception as e:
+                self.logger.warning(f"⚠️ Dọn dẹp khi thoát không hoàn tất: {e}")
+
+        self.root.withdraw()
+        future = asyncio.run_coroutine_threadsafe(shutdown_with_timeout(), self.loop)
+        self._when_done(future, self._closed)
+
+    def _closed(self, future):
+        """Dừng event loop khi dọn dẹp xong rồi mới huỷ cửa sổ"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.log_pump.stop()
+        self.root.destroy()
+
 
 def main():
     """Main function"""
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Whisk Service - Long-running automation daemon with a local job API
+
+Keeps one WhiskAutomator and its tab connections open and runs submitted
+prompt batches one after another on the already-connected tabs, so small
+batches do not pay for interpreter startup, tab discovery and page setup.
+
+HTTP API (127.0.0.1 or a Unix socket):
+    POST   /jobs               {"prompts": ["...", ...]} or one prompt per line
+    GET    /jobs               all jobs
+    GET    /jobs/<id>          status and per-prompt results
+    GET    /jobs/<id>/results  results streamed as JSON lines until the job ends
+    DELETE /jobs/<id>          cancel a queued or running job
+    GET    /health             connection and queue state
+    GET    /metrics            Prometheus metrics
+
+Finished jobs are kept for job_ttl seconds, and at most max_finished_jobs of
+them, after which their status and results are no longer available.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import METRICS
+from whisk_session_takeover import WhiskAutomator, WhiskConfig, setup_logging
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+                405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error"}
+
+
+@dataclass
+class Job:
+    """A submitted prompt batch and its results so far"""
+    id: str
+    prompts: List[str]
+    status: str = JOB_QUEUED
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    cancel_requested: bool = False  # set by cancel(), to tell a job cancel from service shutdown
+    changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def notify(self):
+        """Wake result streams and start a new wait round"""
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def summary(self, with_results: bool = False) -> Dict[str, Any]:
+        data = {
+            'id': self.id,
+            'status': self.status,
+            'total': len(self.prompts),
+            'succeeded': sum(1 for result in self.results if result['ok']),
+            'failed': sum(1 for result in self.results if not result['ok']),
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'error': self.error,
+        }
+        if with_results:
+            data['results'] = self.results
+        return data
+
+
+class WhiskService:
+    """Queues jobs and executes them on one warm WhiskAutomator"""
+
+    def __init__(self, config: WhiskConfig, max_finished_jobs: int = 500, job_ttl: float = 24 * 3600):
+        self.config = config
+        self.max_finished_jobs = max_finished_jobs
+        self.job_ttl = job_ttl
+        self.logger = logging.getLogger(__name__)
+        self.automator = WhiskAutomator(config, [])
+        self.automator.on_result = self._on_result
+        self.jobs: Dict[str, Job] = {}
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.current: Optional[Job] = None
+        self._ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    # --- jobs -------------------------------------------------------------
+
+    def submit(self, prompts: List[str]) -> Job:
+        self._prune_jobs()
+        job = Job(f"{int(time.time())}-{next(self._ids)}", prompts)
+        self.jobs[job.id] = job
+        self.queue.put_nowait(job)
+        self.logger.info(f"Queued job {job.id} with {len(prompts)} prompts ({self.queue.qsize()} waiting)")
+        return job
+
+    def cancel(self, job: Job) -> bool:
+        if job.status in FINISHED_STATES:
+            return False
+        job.cancel_requested = True
+        if job.task:
+            job.task.cancel()
+        else:
+            self._finish(job, JOB_CANCELLED)
+        return True
+
+    def _finish(self, job: Job, status: str, error: str = None):
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        job.notify()
+        self._prune_jobs()
+
+    def _prune_jobs(self):
+        """Forget finished jobs past the age limit, then the oldest beyond the count limit"""
+        now = time.time()
+        finished = sorted((job for job in self.jobs.values() if job.status in FINISHED_STATES),
+                          key=lambda job: job.finished)
+        expired = [job for job in finished if now - job.finished > self.job_ttl]
+        excess = finished[len(expired):][:max(0, len(finished) - len(expired) - self.max_finished_jobs)]
+        for job in expired + excess:
+            del self.jobs[job.id]
+        if expired or excess:
+            self.logger.debug(f"Dropped {len(expired) + len(excess)} finished jobs")
+
+    def _on_result(self, offset: int, prompt: str, ok: bool):
+        job = self.current
+        if job:
+            job.results.append({'index': offset, 'prompt': prompt, 'ok': ok, 'time': time.time()})
+            job.notify()
+
+    async def _run_jobs(self):
+        """Execute queued jobs one at a time on the connected tabs"""
+        while True:
+            job = await self.queue.get()
+            if job.status != JOB_QUEUED:
+                continue
+
+            self.current = job
+            job.status = JOB_RUNNING
+            job.started = time.time()
+            job.notify()
+            self.logger.info(f"Running job {job.id}")
+            job.task = asyncio.create_task(self._execute(job))
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                if not job.cancel_requested:
+                    # The service itself is shutting down
+                    self._finish(job, JOB_CANCELLED, "service stopped")
+                    raise
+                self._finish(job, JOB_CANCELLED)
+                self.logger.info(f"Job {job.id} cancelled")
+            except Exception as e:
+                self._finish(job, JOB_FAILED, str(e))
+                self.logger.error(f"Job {job.id} failed: {e}")
+            finally:
+                self.current = None
+
+    async def _execute(self, job: Job):
+        if not await self.automator.ensure_ready():
+            raise Exception("Could not connect to the Whisk tab")
+        ok = await self.automator.run_batch(job.prompts)
+        succeeded = job.summary()['succeeded']
+        if not ok:
+            # run_batch logs why: no prompts, or fewer than half succeeded
+            raise Exception(f"Batch failed: {succeeded}/{len(job.prompts)} prompts succeeded")
+        self._finish(job, JOB_DONE)
+        self.logger.info(f"Job {job.id} finished: {succeeded}/{len(job.prompts)} prompts succeeded")
+
+    # --- HTTP -------------------------------------------------------------
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        method, path, _ = request_line.split(' ', 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', 0))
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), path.split('?', 1)[0].rstrip('/') or '/', body
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, data: Any,
+                       content_type: str = 'application/json'):
+        body = data if isinstance(data, bytes) else json.dumps(data, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+            .encode('latin-1') + body
+        )
+        await writer.drain()
+
+    async def _stream_results(self, writer: asyncio.StreamWriter, job: Job):
+        """Send results as JSON lines (chunked) as they arrive, then the final status"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+            b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n"
+        )
+
+        async def send(data: Dict[str, Any]):
+            line = (json.dumps(data, ensure_ascii=False) + '\n').encode('utf-8')
+            writer.write(f"{len(line):x}\r\n".encode('latin-1') + line + b"\r\n")
+            await writer.drain()
+
+        sent = 0
+        while True:
+            changed = job.changed
+            while sent < len(job.results):
+                await send(job.results[sent])
+                sent += 1
+            if job.status in FINISHED_STATES:
+                break
+            await changed.wait()
+
+        await send({'job': job.summary()})
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def _parse_prompts(body: bytes) -> List[str]:
+        text = body.decode('utf-8')
+        try:
+            data = json.loads(text)
+        except ValueError:
+            lines = text.splitlines()
+        else:
+            lines = data.get('prompts', []) if isinstance(data, dict) else data
+        if not isinstance(lines, list) or not all(isinstance(line, str) for line in lines):
+            raise ValueError("prompts must be a list of strings")
+        return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            method, path, body = await self._read_request(reader)
+            parts = path.strip('/').split('/')
+
+            if path == '/health':
+                tabs = self.automator.tabs
+                await self._respond(writer, 200, {
+                    'connected': bool(tabs) and all(tab.chrome_client.connected for tab in tabs),
+                    'tabs': len(tabs),
+                    'queued': self.queue.qsize(),
+                    'running': self.current.id if self.current else None,
+                })
+            elif path == '/metrics':
+                await self._respond(writer, 200, METRICS.prometheus_text().encode('utf-8'),
+                                    'text/plain; version=0.0.4')
+            elif path == '/jobs' and method == 'POST':
+                try:
+                    prompts = self._parse_prompts(body)
+                except ValueError as e:
+                    await self._respond(writer, 400, {'error': str(e)})
+                    return
+                if not prompts:
+                    await self._respond(writer, 400, {'error': 'no prompts'})
+                    return
+                await self._respond(writer, 202, self.submit(prompts).summary())
+            elif path == '/jobs':
+                await self._respond(writer, 200, [job.summary() for job in self.jobs.values()])
+            elif parts[0] == 'jobs' and len(parts) in (2, 3):
+                job = self.jobs.get(parts[1])
+                if job is None:
+                    await self._respond(writer, 404, {'error': 'unknown job'})
+                elif len(parts) == 3 and parts[2] == 'results':
+                    await self._stream_results(writer, job)
+                elif len(parts) == 3:
+                    await self._respond(writer, 404, {'error': 'not found'})
+                elif method == 'DELETE':
+                    if self.cancel(job):
+                        await self._respond(writer, 200, job.summary())
+                    else:
+                        await self._respond(writer, 409, {'error': f'job already {job.status}'})
+                else:
+                    await self._respond(writer, 200, job.summary(with_results=True))
+            else:
+                await self._respond(writer, 404, {'error': 'not found'})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            self.logger.error(f"API request failed: {e}")
+            try:
+                await self._respond(writer, 500, {'error': str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    # --- lifecycle --------------------------------------------------------
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, socket_path: str = None):
+        """Connect to Whisk, start the API and run jobs until cancelled"""
+        if not await self.automator.ensure_ready():
+            self.logger.warning("Whisk tab not reachable yet; will retry when the first job arrives")
+
+        if socket_path:
+            self._server = await asyncio.start_unix_server(self._handle, path=socket_path)
+            self.logger.info(f"Whisk service listening on unix:{socket_path}")
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+            self.logger.info(f"Whisk service listening on http://{host}:{port}")
+
+        self._worker = asyncio.create_task(self._run_jobs())
+        try:
+            async with self._server:
+                await self._worker
+        finally:
+            self._worker.cancel()
+            await self.automator.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisk automation service with a local job API")
+    parser.add_argument("--config", default="config.json", help="Settings file")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--listen-port", type=int, default=8765, help="API port")
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--port", type=int, help="Chrome debug port")
+    parser.add_argument("--workers", type=int, help="Number of Whisk tabs processing prompts in parallel")
+    parser.add_argument("--keep-jobs", type=int, default=500, help="Finished jobs kept for GET /jobs")
+    parser.add_argument("--job-ttl-hours", type=float, default=24, help="Hours a finished job is kept")
+    parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    args = parser.parse_args()
+
+    setup_logging("DEBUG" if args.debug else "INFO")
+    config = WhiskConfig.from_file(args.config) if Path(args.config).exists() else WhiskConfig()
+    if args.port:
+        config = replace(config, chrome_debug_port=args.port)
+    if args.workers:
+        config = replace(config, workers=max(1, args.workers))
+
+    service = WhiskService(config, max_finished_jobs=args.keep_jobs, job_ttl=args.job_ttl_hours * 3600)
+    try:
+        asyncio.run(service.serve(args.host, args.listen_port, args.socket))
+    except KeyboardInterrupt:
+        print("\nService stopped")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,72 +14,238 @@ Prerequisites:
 Usage:
     python whisk_session_takeover.py --prompts prompts.txt
     python whisk_session_takeover.py --prompts prompts.txt --delay 30 --debug
+    python whisk_session_takeover.py --prompts prompts.txt --workers 3
+    python whisk_session_takeover.py --prompts prompts.txt --resume
 
 Author: AI Assistant
 Date: 2025-07-02
 """
 
 import asyncio
+import atexit
+import copy
 import json
 import logging
+import logging.handlers
 import argparse
+import queue
+import re
 import time
 import sys
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from urllib.parse import urlparse
+from typing import List, Optional, Dict, Any, Callable, Tuple, AsyncIterator
 import websockets
 import requests
-from dataclasses import dataclass
-from react_input_handler import ReactInputHandler
+from dataclasses import dataclass, field, fields, replace
+from react_input_handler import ReactInputHandler, ClickStrategyCache
+from generation_monitor import GenerationMonitor
+from page_runtime import PageRuntime
+from prompt_journal import PromptJournal, RUN_ALL, RUN_RESUME, RUN_RETRY_FAILED
+from prompt_source import PromptSource, TextFilePromptSource, open_prompt_source
+from pacing import AdaptivePacer
+from metrics import METRICS, MetricsExporter
+from browser_pool import BrowserPool
+from lean_mode import DEFAULT_LEAN_BLOCK, RESOURCE_CLASSES, LeanMode
+from tab_watchdog import TAB_PREWARM, TAB_RECYCLE, TabMemoryWatchdog
+
+
+# Domains whose events only flow after <Domain>.enable. They are enabled while someone
+# listens to one of their events; Fetch and Performance are enabled by their owners.
+EVENT_DOMAINS = ("Runtime", "DOM", "Page", "Network")
+
+# Chrome writes "method" first in events, so it can be read without decoding the params
+EVENT_METHOD = re.compile(r'\{\s*"method"\s*:\s*"([^"]+)"')
+
+
+class CommandInterrupted(ConnectionError):
+    """The connection dropped after a command was sent, so it may or may not have run"""
 
 
 @dataclass
 class WhiskConfig:
     """Configuration for Whisk automation"""
     chrome_debug_port: int = 9222
+    chrome_debug_ports: List[int] = field(default_factory=list)  # several browsers; first is the primary
+    chrome_profiles: List[str] = field(default_factory=list)  # account profile per launched browser
     generation_delay: int = 20
     retry_attempts: int = 3
     retry_delay: int = 5
     prompts_file: str = "prompts.txt"
     log_level: str = "INFO"
     whisk_url_pattern: str = "whisk"
+    command_timeout: float = 30.0
+    workers: int = 1
+    whisk_url: str = "https://labs.google/fx/tools/whisk"
+    input_mode: str = "react"  # "react" (synthetic events) or "native" (Input.insertText)
+    click_strategy_file: str = "click_strategy.json"
+    journal_file: str = "whisk_journal.jsonl"
+    run_mode: str = RUN_ALL  # RUN_ALL, RUN_RESUME or RUN_RETRY_FAILED
+    metrics_port: Optional[int] = None  # serve Prometheus text on this port
+    metrics_file: Optional[str] = None  # write periodic JSON snapshots here
+    metrics_interval: float = 15.0
+    between_prompts_delay: float = 2.0  # starting gap; adapted at runtime unless adaptive_pacing is off
+    adaptive_pacing: bool = True
+    min_prompt_gap: float = 0.0
+    max_prompt_gap: float = 60.0
+    lean_mode: bool = False  # block lean_block resource classes and CSS animations in the tabs
+    lean_block: List[str] = field(default_factory=lambda: list(DEFAULT_LEAN_BLOCK))
+    recycle_heap_mb: float = 1024  # swap in a fresh tab past this JS heap size (0 = no limit)
+    recycle_dom_nodes: int = 200000  # ... or past this many DOM nodes (0 = no limit)
+
+    @property
+    def debug_ports(self) -> List[int]:
+        """Debug ports of every browser to spread tabs across"""
+        return self.chrome_debug_ports or [self.chrome_debug_port]
+
+    @classmethod
+    def from_file(cls, path: str) -> "WhiskConfig":
+        """Load settings from a config.json-style file, ignoring unknown keys"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        known = {field.name for field in fields(cls)}
+        values = {key: value for key, value in data.items() if key in known}
+        timing = data.get('timing', {})
+        if 'between_prompts_delay' in timing:
+            values['between_prompts_delay'] = timing['between_prompts_delay']
+        return cls(**values)
 
 
 class ChromeDevToolsClient:
-    """Chrome DevTools Protocol client for browser automation"""
+    """Chrome DevTools Protocol client for browser automation
+
+    A single background reader owns the websocket: command replies are routed
+    to per-id futures and events are fanned out to subscribers, so several
+    commands can be in flight on the same tab at once.
+
+    Event domains are enabled only while something is subscribed to them, and
+    events nobody listens to are dropped before their params are decoded.
     
-    def __init__(self, debug_port: int = 9222):
+    A heartbeat catches stalled sockets. When the connection drops, the client
+    reconnects to the same target, re-enables its domains, runs the
+    on_reconnect() hooks and re-sends the commands that were in flight.
+    """
+    
+    def __init__(self, debug_port: int = 9222, command_timeout: float = 30.0,
+                 heartbeat_interval: float = 10.0, reconnect_attempts: int = 5):
         self.debug_port = debug_port
+        self.command_timeout = command_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.reconnect_attempts = reconnect_attempts
         self.websocket = None
         self.message_id = 0
         self.logger = logging.getLogger(__name__)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._listeners: Dict[str, List[Callable[[Dict[str, Any]], Any]]] = {}
+        self._reconnect_hooks: List[Callable[[], Any]] = []
+        self._reader_task: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._target: Optional[Dict[str, Any]] = None
+        self._closing = False
+        self._performance_enabled = False
+        self._domain_refs: Dict[str, int] = {}
+        self._enabled_domains: set = set()
+        self._domain_task: Optional[asyncio.Task] = None
+        self.events_processed = 0
+        self.events_dropped = 0
+        self.helpers = PageRuntime(self)
+        self.lean: Optional[LeanMode] = None
         
-    async def connect(self) -> bool:
-        """Connect to Chrome DevTools Protocol"""
+    def list_whisk_tabs(self, url_pattern: str = "whisk") -> List[Dict[str, Any]]:
+        """List the open page targets that look like Whisk tabs"""
+        response = requests.get(f"http://localhost:{self.debug_port}/json")
+        return [
+            tab for tab in response.json()
+            if tab.get('type', 'page') == 'page' and (
+                url_pattern in tab.get('url', '').lower() or url_pattern in tab.get('title', '').lower()
+            )
+        ]
+    
+    def open_tab(self, url: str) -> Dict[str, Any]:
+        """Open a new tab at url and return its target description"""
+        # Recent Chrome versions only accept PUT on /json/new
+        response = requests.put(f"http://localhost:{self.debug_port}/json/new?{url}")
+        return response.json()
+    
+    def _describe_target(self, target: Dict[str, Any], browser_url: str) -> Dict[str, Any]:
+        """Target.TargetInfo in the shape of a /json entry"""
+        host = urlparse(browser_url).netloc
+        return {
+            'id': target['targetId'],
+            'type': target.get('type', 'page'),
+            'title': target.get('title', ''),
+            'url': target.get('url', ''),
+            'webSocketDebuggerUrl': f"ws://{host}/devtools/page/{target['targetId']}"
+        }
+    
+    async def _browser_command(self, method: str, params: Dict[str, Any] = None) -> Tuple[Dict[str, Any], str]:
+        """Send one command over a short-lived connection to the browser endpoint
+
+        Returns the result and the browser endpoint URL.
+        """
+        response = await asyncio.to_thread(
+            requests.get, f"http://localhost:{self.debug_port}/json/version", timeout=5
+        )
+        browser_url = response.json().get('webSocketDebuggerUrl')
+        if not browser_url:
+            raise ConnectionError("Chrome did not report a browser endpoint")
+        
+        async with websockets.connect(browser_url, max_size=None) as browser:
+            await browser.send(json.dumps({"id": 1, "method": method, "params": params or {}}))
+            while True:
+                data = json.loads(await asyncio.wait_for(browser.recv(), self.command_timeout))
+                if data.get("id") == 1:
+                    if "error" in data:
+                        raise Exception(f"Chrome DevTools error: {data['error']}")
+                    return data.get("result", {}), browser_url
+    
+    async def find_whisk_tabs(self, url_pattern: str = "whisk") -> List[Dict[str, Any]]:
+        """List Whisk page targets via Target.getTargets without blocking the loop"""
         try:
-            # Get list of tabs
-            response = requests.get(f"http://localhost:{self.debug_port}/json")
-            tabs = response.json()
-            
-            # Find Whisk tab
-            whisk_tab = None
-            for tab in tabs:
-                if 'whisk' in tab.get('url', '').lower() or 'whisk' in tab.get('title', '').lower():
-                    whisk_tab = tab
-                    break
+            result, browser_url = await self._browser_command("Target.getTargets")
+        except Exception as e:
+            self.logger.debug(f"Target.getTargets unavailable ({e}), falling back to /json")
+            return await asyncio.to_thread(self.list_whisk_tabs, url_pattern)
+        
+        return [
+            self._describe_target(target, browser_url) for target in result.get('targetInfos', [])
+            if target.get('type') == 'page' and (
+                url_pattern in target.get('url', '').lower() or url_pattern in target.get('title', '').lower()
+            )
+        ]
+    
+    async def create_tab(self, url: str) -> Dict[str, Any]:
+        """Open a new tab at url via Target.createTarget and return its description"""
+        try:
+            result, browser_url = await self._browser_command("Target.createTarget", {"url": url})
+        except Exception as e:
+            self.logger.debug(f"Target.createTarget unavailable ({e}), falling back to /json/new")
+            return await asyncio.to_thread(self.open_tab, url)
+        return self._describe_target({'targetId': result['targetId'], 'url': url}, browser_url)
+    
+    async def connect(self, tab: Dict[str, Any] = None) -> bool:
+        """Connect to Chrome DevTools Protocol (first Whisk tab unless tab is given)"""
+        try:
+            whisk_tab = tab
+            if whisk_tab is None:
+                # Find Whisk tab
+                tabs = await self.find_whisk_tabs()
+                whisk_tab = tabs[0] if tabs else None
             
             if not whisk_tab:
                 self.logger.error("No Whisk tab found. Please ensure Whisk is open in Chrome.")
                 return False
             
             # Connect to the Whisk tab
-            websocket_url = whisk_tab['webSocketDebuggerUrl']
-            self.websocket = await websockets.connect(websocket_url)
-            self.logger.info(f"Connected to Whisk tab: {whisk_tab['title']}")
+            self._target = whisk_tab
+            self._closing = False
+            await self._open()
+            self.logger.info(f"Connected to Whisk tab: {whisk_tab.get('title') or whisk_tab['webSocketDebuggerUrl']}")
             
-            # Enable runtime and DOM domains
-            await self._send_command("Runtime.enable")
-            await self._send_command("DOM.enable")
+            # Install the page helpers once; they survive reloads
+            await self.helpers.install()
             
             return True
             
@@ -87,89 +253,417 @@ class ChromeDevToolsClient:
             self.logger.error(f"Failed to connect to Chrome: {e}")
             return False
     
-    async def _send_command(self, method: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Send command to Chrome DevTools"""
+    async def _open(self):
+        """Open the websocket to the current target and enable the domains we use"""
+        self.websocket = await websockets.connect(self._target['webSocketDebuggerUrl'], max_size=None)
+        self._performance_enabled = False
+        self._reader_task = asyncio.create_task(self._read_loop())
+        
+        # Enable the domains someone is subscribed to
+        self._enabled_domains = set()
+        wanted = [domain for domain, refs in self._domain_refs.items() if refs]
+        await asyncio.gather(*(self._send_once(f"{domain}.enable") for domain in wanted))
+        self._enabled_domains.update(wanted)
+        
+        if self.heartbeat_interval and (self._heartbeat_task is None or self._heartbeat_task.done()):
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+    
+    async def enable_lean_mode(self, block: List[str] = None) -> LeanMode:
+        """Block the given resource classes and CSS animations in this tab (kept across reconnects)"""
+        if self.lean is None:
+            self.lean = LeanMode(self, block)
+            await self.lean.apply()
+        return self.lean
+    
+    async def performance_metrics(self) -> Dict[str, float]:
+        """Renderer counters from Performance.getMetrics (TaskDuration, ScriptDuration, ...)"""
+        if not self._performance_enabled:
+            await self._send_command("Performance.enable")
+            self._performance_enabled = True
+        result = await self._send_command("Performance.getMetrics")
+        return {metric['name']: metric['value'] for metric in result.get('metrics', [])}
+    
+    def on_reconnect(self, hook: Callable[[], Any]):
+        """Run hook (sync or async) after every transparent reconnection"""
+        self._reconnect_hooks.append(hook)
+    
+    async def _reconnect(self) -> bool:
+        """Reconnect to the same target with backoff; True once the session is restored"""
+        delay = 0.5
+        for attempt in range(1, self.reconnect_attempts + 1):
+            await asyncio.sleep(delay)
+            try:
+                await self._open()
+                for hook in list(self._reconnect_hooks):
+                    result = hook()
+                    if asyncio.iscoroutine(result):
+                        await result
+                METRICS.inc("cdp_reconnects", outcome="ok")
+                self.logger.info(f"Reconnected to Chrome DevTools (attempt {attempt})")
+                return True
+            except Exception as e:
+                self.logger.warning(f"Reconnect attempt {attempt}/{self.reconnect_attempts} failed: {e}")
+                if self.websocket:
+                    await self.websocket.close()
+                delay = min(delay * 2, 8.0)
+        
+        METRICS.inc("cdp_reconnects", outcome="failed")
+        self.logger.error("Could not reconnect to Chrome DevTools")
+        return False
+    
+    async def _heartbeat(self):
+        """Drop the socket after two missed heartbeats so the reader triggers a reconnect"""
+        missed = 0
+        while not self._closing:
+            await asyncio.sleep(self.heartbeat_interval)
+            if not self.connected:
+                continue
+            try:
+                # Answered by the browser process, so a busy page does not count as a miss
+                await self._send_command("Target.getTargetInfo", timeout=self.heartbeat_interval)
+                missed = 0
+            except TimeoutError:
+                missed += 1
+                self.logger.warning(f"Chrome DevTools heartbeat missed ({missed})")
+                if missed >= 2:
+                    missed = 0
+                    self.websocket.transport.abort()
+            except Exception as e:
+                self.logger.debug(f"Heartbeat failed: {e}")
+    
+    async def _read_loop(self):
+        """Dispatch incoming messages to pending commands and event listeners"""
+        error: Exception = ConnectionError("Chrome DevTools connection closed")
+        try:
+            async for raw in self.websocket:
+                match = EVENT_METHOD.match(raw)
+                if match and match.group(1) not in self._listeners:
+                    self.events_dropped += 1
+                    METRICS.inc("cdp_events", outcome="dropped")
+                    continue
+                
+                data = json.loads(raw)
+                if "id" in data:
+                    future = self._pending.pop(data["id"], None)
+                    if future is None or future.done():
+                        continue
+                    if "error" in data:
+                        future.set_exception(Exception(f"Chrome DevTools error: {data['error']}"))
+                    else:
+                        future.set_result(data.get("result", {}))
+                else:
+                    self.events_processed += 1
+                    METRICS.inc("cdp_events", outcome="processed")
+                    self._dispatch_event(data.get("method", ""), data.get("params", {}))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = ConnectionError(f"Chrome DevTools connection lost: {e}")
+            self.logger.error(str(error))
+        finally:
+            # Nobody will answer these any more; _send_command re-sends them after a reconnect
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+            reconnecting = self._reconnect_task is not None and not self._reconnect_task.done()
+            if not self._closing and self._target is not None and not reconnecting:
+                self.logger.warning("Chrome DevTools connection dropped, reconnecting...")
+                self._reconnect_task = asyncio.create_task(self._reconnect())
+    
+    def _dispatch_event(self, method: str, params: Dict[str, Any]):
+        """Call every listener subscribed to an event"""
+        for handler in list(self._listeners.get(method, [])):
+            try:
+                result = handler(params)
+                if asyncio.iscoroutine(result):
+                    asyncio.create_task(result)
+            except Exception as e:
+                self.logger.error(f"Event handler for {method} failed: {e}")
+    
+    def on(self, method: str, handler: Callable[[Dict[str, Any]], Any]):
+        """Subscribe to a DevTools event; handler receives the event params
+
+        The event's domain is enabled before the next command is sent.
+        """
+        self._listeners.setdefault(method, []).append(handler)
+        self._change_domain_refs(method, 1)
+    
+    def off(self, method: str, handler: Callable[[Dict[str, Any]], Any]):
+        """Remove an event subscription added with on()"""
+        handlers = self._listeners.get(method, [])
+        if handler in handlers:
+            handlers.remove(handler)
+            self._change_domain_refs(method, -1)
+        if not handlers:
+            self._listeners.pop(method, None)
+    
+    def _change_domain_refs(self, method: str, delta: int):
+        """Count subscriptions per domain; enable or disable it when the count leaves or reaches 0"""
+        domain = method.partition('.')[0]
+        if domain not in EVENT_DOMAINS:
+            return
+        refs = self._domain_refs.get(domain, 0) + delta
+        self._domain_refs[domain] = refs
+        # Before connecting, _open() enables whatever is subscribed by then
+        if self.connected and (refs == 0 or refs == delta):
+            if self._domain_task is None or self._domain_task.done():
+                self._domain_task = asyncio.create_task(self._sync_domains())
+    
+    async def _sync_domains(self):
+        """Enable or disable domains until they match the subscriptions"""
+        while True:
+            wanted = {domain for domain, refs in self._domain_refs.items() if refs}
+            changes = [(domain, "enable") for domain in wanted - self._enabled_domains]
+            changes += [(domain, "disable") for domain in self._enabled_domains - wanted]
+            if not changes:
+                return
+            for domain, action in changes:
+                try:
+                    await self._send_once(f"{domain}.{action}")
+                except ConnectionError:
+                    # The reconnect enables the subscribed domains itself
+                    return
+                except Exception as e:
+                    self.logger.warning(f"{domain}.{action} failed: {e}")
+                    return
+                if action == "enable":
+                    self._enabled_domains.add(domain)
+                else:
+                    self._enabled_domains.discard(domain)
+    
+    async def _domains_settled(self):
+        """Wait for pending domain enables/disables so later commands and events see them"""
+        task = self._domain_task
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            await asyncio.shield(task)
+    
+    async def _send_command(self, method: str, params: Dict[str, Any] = None,
+                            timeout: float = None, resend: bool = True) -> Dict[str, Any]:
+        """Send command to Chrome DevTools and wait for its reply
+
+        If the connection drops, waits for the reconnect and sends the command
+        once more on the new session. Commands that change page state (typing,
+        clicking) pass resend=False: if they were already sent they raise
+        CommandInterrupted instead, once reconnected, so the caller can check
+        the page before acting again.
+        """
+        await self._domains_settled()
+        for attempt in range(2):
+            if not self.connected:
+                await self._wait_reconnected()
+            try:
+                return await self._send_once(method, params, timeout)
+            except ConnectionError as e:
+                if not resend and isinstance(e, CommandInterrupted):
+                    if self._reconnect_task is not None and not self._closing:
+                        await self._wait_reconnected()
+                    raise
+                if attempt or self._closing or self._reconnect_task is None:
+                    raise
+                self.logger.warning(f"Connection dropped during {method}, resending after reconnect")
+    
+    async def _wait_reconnected(self):
+        """Wait for an in-progress reconnect; raise if there is none or it fails"""
+        task = self._reconnect_task
+        if self._closing or task is None or task is asyncio.current_task():
+            raise ConnectionError("Not connected to Chrome DevTools")
+        if not await asyncio.shield(task) or not self.connected:
+            raise ConnectionError("Chrome DevTools connection lost")
+    
+    async def _send_once(self, method: str, params: Dict[str, Any] = None,
+                         timeout: float = None) -> Dict[str, Any]:
+        """Send one command on the current websocket and wait for its reply"""
+        if self.websocket is None or not self.connected:
+            raise ConnectionError("Not connected to Chrome DevTools")
+        
         self.message_id += 1
+        message_id = self.message_id
         message = {
-            "id": self.message_id,
+            "id": message_id,
             "method": method,
             "params": params or {}
         }
         
-        await self.websocket.send(json.dumps(message))
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
         
-        # Wait for response
-        while True:
-            response = await self.websocket.recv()
-            data = json.loads(response)
-            
-            if data.get("id") == self.message_id:
-                if "error" in data:
-                    raise Exception(f"Chrome DevTools error: {data['error']}")
-                return data.get("result", {})
+        started = time.perf_counter()
+        sent = False
+        try:
+            await self.websocket.send(json.dumps(message))
+            sent = True
+            return await asyncio.wait_for(future, timeout or self.command_timeout)
+        except asyncio.TimeoutError:
+            METRICS.inc("cdp_command_errors", method=method, reason="timeout")
+            raise TimeoutError(f"Chrome DevTools command {method} timed out")
+        except (websockets.ConnectionClosed, ConnectionError) as e:
+            METRICS.inc("cdp_command_errors", method=method, reason="closed")
+            if sent:
+                raise CommandInterrupted(f"Connection lost while {method} was in flight: {e}")
+            raise ConnectionError(f"Chrome DevTools connection lost: {e}")
+        except Exception:
+            METRICS.inc("cdp_command_errors", method=method, reason="error")
+            raise
+        finally:
+            self._pending.pop(message_id, None)
+            METRICS.observe("cdp_command_seconds", time.perf_counter() - started, method=method)
     
-    async def execute_javascript(self, script: str) -> Any:
+    async def execute_javascript(self, script: str, await_promise: bool = False,
+                                 timeout: float = None) -> Any:
         """Execute JavaScript in the browser"""
         result = await self._send_command("Runtime.evaluate", {
             "expression": script,
-            "returnByValue": True
-        })
+            "returnByValue": True,
+            "awaitPromise": await_promise
+        }, timeout=timeout)
         
         if result.get("exceptionDetails"):
             raise Exception(f"JavaScript error: {result['exceptionDetails']}")
         
         return result.get("result", {}).get("value")
     
-    async def wait_for_element(self, selector: str, timeout: int = 10) -> bool:
-        """Wait for element to be present"""
-        script = f"""
-        (() => {{
-            const element = document.querySelector('{selector}');
-            return element !== null;
-        }})()
+    async def wait_until(self, predicate: str, timeout: float = 10) -> Any:
+        """Wait in the page until a JS expression becomes truthy
+
+        The expression is re-evaluated inside the page whenever the DOM or an
+        attribute changes, so the whole wait is a single Runtime.evaluate.
+        Returns the truthy value, or None if the timeout expires first.
         """
+        script = f"""
+        new Promise((resolve) => {{
+            const test = () => {{
+                try {{
+                    return ({predicate});
+                }} catch (e) {{
+                    return null;
+                }}
+            }};
 
-        return await self.execute_javascript(script)
-    
+            const initial = test();
+            if (initial) {{
+                resolve(initial);
+                return;
+            }}
 
+            let finished = false;
+            const finish = (value) => {{
+                if (finished) return;
+                finished = true;
+                observer.disconnect();
+                clearInterval(fallback);
+                clearTimeout(timer);
+                resolve(value);
+            }};
+            const recheck = () => {{
+                const value = test();
+                if (value) finish(value);
+            }};
 
-    async def click_element(self, selector: str) -> bool:
-        """Click an element"""
-        script = f"""
-        (() => {{
-            const element = document.querySelector('{selector}');
-            if (!element) return false;
+            const observer = new MutationObserver(recheck);
+            observer.observe(document.documentElement, {{
+                childList: true,
+                subtree: true,
+                attributes: true,
+                characterData: true
+            }});
+            // Property-only changes (e.g. .disabled set without an attribute) emit no mutations
+            const fallback = setInterval(recheck, 500);
+            const timer = setTimeout(() => finish(null), {int(timeout * 1000)});
+        }})
+        """
 
-            // Check if button is enabled
-            if (element.disabled) return false;
+        return await self.execute_javascript(script, await_promise=True, timeout=timeout + self.command_timeout)
+    
+    async def wait_for_element(self, selector: str, timeout: int = 10) -> bool:
+        """Wait for element to be present"""
+        predicate = f"document.querySelector({json.dumps(selector)}) !== null"
+        return bool(await self.wait_until(predicate, timeout))
 
-            element.click();
-            return true;
-        }})()
-        """
 
-        return await self.execute_javascript(script)
+    async def click_element(self, selector: str) -> bool:
+        """Click an element (only if it is enabled)"""
+        return bool(await self.helpers.call('click', self.helpers.element(selector), resend=False))
     
+    @property
+    def connected(self) -> bool:
+        """Whether the tab connection is up and its reader still running"""
+        return self._reader_task is not None and not self._reader_task.done()
+
     async def close(self):
         """Close the WebSocket connection"""
+        self._closing = True
+        for task in (self._heartbeat_task, self._reconnect_task):
+            if task and not task.done():
+                task.cancel()
+        self._heartbeat_task = self._reconnect_task = None
+        if self.events_processed or self.events_dropped:
+            self.logger.debug(f"DevTools events: {self.events_processed} handled, "
+                              f"{self.events_dropped} dropped without decoding")
         if self.websocket:
             await self.websocket.close()
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+
+
+@dataclass
+class WhiskTab:
+    """One Whisk tab driven by its own DevTools connection"""
+    name: str
+    chrome_client: ChromeDevToolsClient
+    react_handler: Optional[ReactInputHandler] = None
+    generation_monitor: Optional[GenerationMonitor] = None
+    processed: int = 0
+    successes: int = 0
+    last_attempts: int = 0
+    last_latency: Optional[float] = None
+    last_quota: bool = False
+    standby: Optional[asyncio.Task] = None  # fresh tab being loaded to replace this one
+    lost: bool = False  # its browser went away and no replacement tab could be opened
 
 
 class WhiskAutomator:
-    """Main automation class for Whisk platform"""
+    """Main automation class for Whisk platform
+
+    Prompts are streamed from config.prompts_file (text or .jsonl) unless
+    an in-memory iterable, async iterable or PromptSource is passed instead.
+    """
+
+    # Settings every batch reads afresh; the others shaped the tab connections,
+    # journal, click strategy cache or watchdog when the automator was built
+    BATCH_SETTINGS = frozenset({
+        'generation_delay', 'retry_attempts', 'retry_delay', 'prompts_file', 'log_level',
+        'input_mode', 'run_mode', 'between_prompts_delay', 'adaptive_pacing',
+        'min_prompt_gap', 'max_prompt_gap',
+    })
     
-    def __init__(self, config: WhiskConfig):
+    def __init__(self, config: WhiskConfig, prompts: Any = None):
         self.config = config
-        self.chrome_client = ChromeDevToolsClient(config.chrome_debug_port)
+        self.prompt_source: PromptSource = open_prompt_source(
+            prompts if prompts is not None else config.prompts_file
+        )
+        self.chrome_client = ChromeDevToolsClient(config.debug_ports[0], config.command_timeout)
         self.logger = logging.getLogger(__name__)
         self.react_handler = None  # Will be initialized after chrome_client connects
+        self.tabs: List[WhiskTab] = []
+        self.click_strategy = ClickStrategyCache(config.click_strategy_file)
+        self.journal = PromptJournal(config.journal_file)
+        self.pacer: Optional[AdaptivePacer] = None
+        self.watchdog = TabMemoryWatchdog(config.recycle_heap_mb, config.recycle_dom_nodes, logger=self.logger)
+        # Called with (offset, prompt, ok) as each prompt finishes
+        self.on_result: Optional[Callable[[int, str, bool], None]] = None
 
         # Common selectors for Whisk interface (updated based on actual HTML inspection)
         self.selectors = {
             'prompt_input': 'textarea[placeholder*="Describe your idea"], textarea.sc-19fd03b4-7.jjuyuu, textarea',
             'generate_button': 'button[aria-label="Submit prompt"], button[type="submit"], button.sc-bece3008-0.iCCEfi',
-            'loading_indicator': '.loading, .spinner, [data-loading="true"], .generating'
+            'loading_indicator': '.loading, .spinner, [data-loading="true"], .generating',
+            'result_image': 'img[src^="blob:"], img[src^="data:image"]'
         }
     
     async def initialize(self) -> bool:
@@ -180,75 +674,206 @@ class WhiskAutomator:
             return False
 
         # Initialize React handler after chrome client is connected
-        self.react_handler = ReactInputHandler(self.chrome_client, self.logger)
+        primary = await self._make_tab("tab-1", self.chrome_client)
+        self.react_handler = primary.react_handler
+        self.tabs = [primary]
 
-        # Wait for page to be ready
-        await asyncio.sleep(2)
+        if max(self.config.workers, len(self.config.debug_ports)) > 1 and not await self._open_worker_tabs():
+            return False
+
+        # Wait for the prompt input rather than a fixed settle delay
+        if not await self._wait_for_tab_ready(primary, timeout=10):
+            self.logger.warning("Prompt input not visible yet, continuing anyway")
 
         self.logger.info("Whisk automation tool initialized successfully")
         return True
     
-    def load_prompts(self) -> List[str]:
-        """Load prompts from file"""
-        prompts_path = Path(self.config.prompts_file)
-        
-        if not prompts_path.exists():
-            self.logger.error(f"Prompts file not found: {prompts_path}")
-            return []
-        
+    async def _open_worker_tabs(self) -> bool:
+        """Connect one extra Whisk tab per worker, round-robin over the browsers
+
+        Existing Whisk tabs are reused before new ones are opened.
+        """
+        ports = self.config.debug_ports
+        unused: Dict[int, List[Dict[str, Any]]] = {}
         try:
-            with open(prompts_path, 'r', encoding='utf-8') as f:
-                prompts = [line.strip() for line in f if line.strip()]
+            for port in ports:
+                tabs = await ChromeDevToolsClient(port).find_whisk_tabs(self.config.whisk_url_pattern)
+                # The primary tab is the first Whisk tab of the first browser
+                unused[port] = tabs[1:] if port == self.chrome_client.debug_port else tabs
+        except Exception as e:
+            self.logger.error(f"Failed to list Chrome tabs: {e}")
+            return False
+        
+        for index in range(1, max(self.config.workers, len(ports))):
+            port = ports[index % len(ports)]
+            client = ChromeDevToolsClient(port, self.config.command_timeout)
+            if unused[port]:
+                target = unused[port].pop(0)
+                fresh = False
+            else:
+                target = await client.create_tab(self.config.whisk_url)
+                fresh = True
             
-            self.logger.info(f"Loaded {len(prompts)} prompts from {prompts_path}")
-            return prompts
+            if not await client.connect(target):
+                self.logger.error(f"Failed to connect worker tab {index + 1}")
+                return False
             
-        except Exception as e:
-            self.logger.error(f"Failed to load prompts: {e}")
-            return []
+            tab = await self._make_tab(f"tab-{index + 1}", client)
+            if fresh and not await self._wait_for_tab_ready(tab):
+                self.logger.error(f"Worker tab {index + 1} did not load Whisk")
+                return False
+            self.tabs.append(tab)
+        
+        self.logger.info(f"Using {len(self.tabs)} Whisk tabs across {len(ports)} browser(s)")
+        return True
+    
+    async def _make_tab(self, name: str, client: ChromeDevToolsClient) -> WhiskTab:
+        """Build the per-tab handlers for a connected client"""
+        monitor = GenerationMonitor(
+            client, self.logger, self.selectors['loading_indicator'], self.selectors['result_image']
+        )
+        await monitor.install()
+        if self.config.lean_mode:
+            await client.enable_lean_mode(self.config.lean_block)
+        return WhiskTab(name, client, ReactInputHandler(client, self.logger, self.click_strategy), monitor)
+    
+    async def _wait_for_tab_ready(self, tab: WhiskTab, timeout: float = 30) -> bool:
+        """Wait until a freshly opened tab shows the prompt input
+
+        A new tab is still navigating from about:blank, which destroys the
+        context the in-page wait runs in, so failed or short waits are retried
+        with whatever time is left.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                if await tab.chrome_client.wait_for_element(self.selectors['prompt_input'], remaining):
+                    return True
+            except Exception as e:
+                self.logger.debug(f"[{tab.name}] Readiness check failed: {e}")
+                await asyncio.sleep(min(0.5, max(0.0, deadline - loop.time())))
     
-    async def process_prompt(self, prompt: str, prompt_index: int) -> bool:
-        """Process a single prompt"""
-        self.logger.info(f"Processing prompt {prompt_index + 1}: {prompt[:50]}...")
+    async def process_prompt(self, prompt: str, prompt_index: int, tab: WhiskTab = None) -> bool:
+        """Process a single prompt (on the primary tab unless tab is given)"""
+        tab = tab or self.tabs[0]
+        chrome_client = tab.chrome_client
+        react_handler = tab.react_handler
+        generation_monitor = tab.generation_monitor
+        self.logger.info(f"[{tab.name}] Processing prompt {prompt_index + 1}: {prompt[:50]}...")
         
+        # Kept across attempts: a success after a quota alert must not speed the pacer up
+        tab.last_quota = False
         for attempt in range(self.config.retry_attempts):
+            tab.last_attempts = attempt + 1
+            tab.last_latency = None
+            token = None
+            if attempt:
+                METRICS.inc("prompt_retries")
             try:
                 # Wait for prompt input field
-                if not await self.chrome_client.wait_for_element(self.selectors['prompt_input']):
+                with METRICS.timer("prompt_stage_seconds", stage="wait_input"):
+                    input_found = await chrome_client.wait_for_element(self.selectors['prompt_input'])
+                if not input_found:
                     self.logger.warning(f"Prompt input field not found (attempt {attempt + 1})")
                     await asyncio.sleep(self.config.retry_delay)
                     continue
 
-                # Fill the prompt using React-aware handler
-                self.logger.info(f"Filling prompt with React handler: {prompt[:30]}...")
-                if not await self.react_handler.fill_react_textarea(self.selectors['prompt_input'], prompt):
-                    self.logger.warning(f"Failed to fill prompt with React handler (attempt {attempt + 1})")
-                    await asyncio.sleep(self.config.retry_delay)
-                    continue
+                fill_started = time.perf_counter()
+                if self.config.input_mode == "native":
+                    # Real text input; the same step confirms the button became enabled
+                    self.logger.info(f"Typing prompt with Input.insertText: {prompt[:30]}...")
+                    with METRICS.timer("prompt_stage_seconds", stage="fill"):
+                        button_enabled = await react_handler.fill_native(
+                            self.selectors['prompt_input'], prompt, self.selectors['generate_button'], timeout=15
+                        )
+                else:
+                    # Fill the prompt using React-aware handler
+                    self.logger.info(f"Filling prompt with React handler: {prompt[:30]}...")
+                    with METRICS.timer("prompt_stage_seconds", stage="fill"):
+                        filled = await react_handler.fill_react_textarea(self.selectors['prompt_input'], prompt)
+                    if not filled:
+                        self.logger.warning(f"Failed to fill prompt with React handler (attempt {attempt + 1})")
+                        await asyncio.sleep(self.config.retry_delay)
+                        continue
+
+                    # Wait for React to update state and enable button
+                    self.logger.info("Waiting for submit button to be enabled...")
+                    with METRICS.timer("prompt_stage_seconds", stage="wait_button"):
+                        button_enabled = await react_handler.wait_for_button_enabled_advanced(
+                            self.selectors['generate_button'], timeout=15
+                        )
+                fill_duration = time.perf_counter() - fill_started
+                self.logger.info(
+                    f"Prompt ready to submit after {fill_duration:.2f}s ({self.config.input_mode} input)",
+                    extra={'prompt_index': prompt_index, 'tab': tab.name, 'stage': 'fill', 'duration': round(fill_duration, 3)}
+                )
 
-                # Wait for React to update state and enable button
-                self.logger.info("Waiting for submit button to be enabled...")
-                if not await self.react_handler.wait_for_button_enabled_advanced(self.selectors['generate_button'], timeout=15):
-                    self.logger.warning(f"Generate button not enabled naturally, trying force methods (attempt {attempt + 1})")
+                # Start watching for this generation's outputs before clicking
+                token = await generation_monitor.arm()
 
-                    # Try force enable and click
-                    if not await self.react_handler.force_enable_and_click(self.selectors['generate_button']):
-                        self.logger.warning(f"All click methods failed (attempt {attempt + 1})")
+                with METRICS.timer("prompt_stage_seconds", stage="click"):
+                    try:
+                        if not button_enabled:
+                            self.logger.warning(f"Generate button not enabled naturally, trying force methods (attempt {attempt + 1})")
+                            METRICS.inc("click_path", path="force")
+
+                            # Try force enable and click
+                            clicked = await react_handler.force_enable_and_click(self.selectors['generate_button'])
+                        else:
+                            # Button is enabled, try normal click
+                            self.logger.info("Button enabled, attempting normal click...")
+                            clicked = await chrome_client.click_element(self.selectors['generate_button'])
+                            if clicked:
+                                METRICS.inc("click_path", path="normal")
+                            else:
+                                self.logger.warning(f"Normal click failed, trying force methods (attempt {attempt + 1})")
+                                METRICS.inc("click_path", path="normal_then_force")
+                                clicked = await react_handler.force_enable_and_click(self.selectors['generate_button'])
+                    except CommandInterrupted as e:
+                        # Clicking again could submit the prompt twice; look at the page instead
+                        self.logger.warning(f"{e}; checking whether the prompt was submitted")
+                        clicked = generation_monitor.reported(token) or await react_handler.submission_started()
+                if not clicked:
+                    self.logger.warning(f"All click methods failed (attempt {attempt + 1})")
+                    await asyncio.sleep(self.config.retry_delay)
+                    continue
+                
+                # Wait for the page to report the outputs, bounded by generation_delay
+                self.logger.info(f"Waiting up to {self.config.generation_delay} seconds for generation...")
+                with METRICS.timer("prompt_stage_seconds", stage="generation"):
+                    outcome = await generation_monitor.wait(token, self.config.generation_delay)
+                if outcome is None:
+                    METRICS.inc("generation_outcomes", status="timeout")
+                    self.logger.warning(f"No completion signal after {self.config.generation_delay} seconds, moving on")
+                elif outcome.get('status') != 'done' and outcome.get('alert'):
+                    # Whisk rejected the prompt with a quota or error alert; submit it again
+                    quota = generation_monitor.is_quota_signal(outcome)
+                    tab.last_quota = tab.last_quota or quota
+                    METRICS.inc("generation_outcomes", status="quota" if quota else "error")
+                    self.logger.warning(f"Generation failed (attempt {attempt + 1}): {outcome['alert']}")
+                    if quota and self.pacer and attempt + 1 < self.config.retry_attempts:
+                        # Wait for the backed-off pacer rather than a fixed delay
+                        await self.pacer.retry(quota=True)
+                    else:
                         await asyncio.sleep(self.config.retry_delay)
-                        continue
+                    continue
+                elif outcome.get('status') != 'done':
+                    # The generation ran, only its outputs did not match result_image;
+                    # resubmitting would generate (and spend quota on) the prompt again
+                    METRICS.inc("generation_outcomes", status=outcome.get('status'))
+                    self.logger.warning("Generation finished without matching result images, not resubmitting")
                 else:
-                    # Button is enabled, try normal click
-                    self.logger.info("Button enabled, attempting normal click...")
-                    if not await self.chrome_client.click_element(self.selectors['generate_button']):
-                        self.logger.warning(f"Normal click failed, trying force methods (attempt {attempt + 1})")
-                        if not await self.react_handler.force_enable_and_click(self.selectors['generate_button']):
-                            self.logger.warning(f"All click methods failed (attempt {attempt + 1})")
-                            await asyncio.sleep(self.config.retry_delay)
-                            continue
-                
-                # Wait for generation to complete
-                self.logger.info(f"Waiting {self.config.generation_delay} seconds for generation...")
-                await asyncio.sleep(self.config.generation_delay)
+                    tab.last_latency = outcome.get('elapsed')
+                    METRICS.inc("generation_outcomes", status="done")
+                    self.logger.info(
+                        f"Generation finished in {outcome.get('elapsed', 0):.1f}s ({outcome.get('outputs')} new outputs)",
+                        extra={'prompt_index': prompt_index, 'tab': tab.name, 'stage': 'generation',
+                               'duration': round(outcome.get('elapsed', 0), 3)}
+                    )
                 
                 self.logger.info(f"Successfully processed prompt {prompt_index + 1}")
                 return True
@@ -256,37 +881,344 @@ class WhiskAutomator:
             except Exception as e:
                 self.logger.error(f"Error processing prompt (attempt {attempt + 1}): {e}")
                 await asyncio.sleep(self.config.retry_delay)
+            finally:
+                if token:
+                    generation_monitor.cancel(token)
         
         self.logger.error(f"Failed to process prompt after {self.config.retry_attempts} attempts")
         return False
     
+    async def _execute(self, offset: int, prompt: str, tab: WhiskTab) -> bool:
+        """Process one prompt on a tab (paced by the controller) and journal its outcome"""
+        await self.pacer.acquire()
+        started = time.time()
+        await self.journal.record(offset, prompt, 'started', tab=tab.name)
+        
+        ok = False
+        try:
+            ok = await self.process_prompt(prompt, offset, tab)
+        finally:
+            await self.pacer.release(ok, tab.last_latency, tab.last_quota)
+        
+        finished = time.time()
+        METRICS.inc("prompts", status="done" if ok else "failed")
+        METRICS.observe("prompt_seconds", finished - started)
+        await self.journal.record(
+            offset, prompt, 'done' if ok else 'failed',
+            tab=tab.name, attempts=tab.last_attempts,
+            started_at=started, finished_at=finished, duration=round(finished - started, 3)
+        )
+        tab.processed += 1
+        if self.on_result:
+            self.on_result(offset, prompt, ok)
+        if ok:
+            tab.successes += 1
+        else:
+            self.logger.warning(
+                f"[{tab.name}] Skipping failed prompt {offset + 1}",
+                extra={'prompt_index': offset, 'tab': tab.name, 'stage': 'prompt', 'duration': round(finished - started, 3)}
+            )
+        if self.watchdog.enabled:
+            await self._watch_tab(tab)
+        return ok
+    
+    async def _watch_tab(self, tab: WhiskTab):
+        """Between prompts: pre-load a standby tab as memory grows, swap it in past the limit"""
+        state = await self.watchdog.check(tab.name, tab.chrome_client)
+        if state not in (TAB_PREWARM, TAB_RECYCLE):
+            return
+        
+        if tab.standby is None:
+            self.logger.info(f"[{tab.name}] Tab memory growing ({self.watchdog.describe(tab.name)}), loading a standby tab")
+            tab.standby = asyncio.create_task(self._open_standby(tab))
+        if state != TAB_RECYCLE:
+            return
+        
+        fresh = await tab.standby
+        tab.standby = None
+        if fresh is None:
+            # Keep using the old tab; the next prompt boundary tries again
+            METRICS.inc("tab_recycles", outcome="failed")
+            return
+        await self._swap_tab(tab, fresh)
+    
+    async def _open_standby(self, tab: WhiskTab, target: Dict[str, Any] = None) -> Optional[WhiskTab]:
+        """Open a new Whisk tab (or attach to target) in the same browser and wait until it is usable"""
+        client = ChromeDevToolsClient(tab.chrome_client.debug_port, self.config.command_timeout)
+        try:
+            if target is None:
+                target = await client.create_tab(self.config.whisk_url)
+            if not await client.connect(target):
+                raise ConnectionError("could not connect to the new tab")
+            standby = await self._make_tab(f"{tab.name}-standby", client)
+            if not await self._wait_for_tab_ready(standby):
+                raise TimeoutError("Whisk did not load")
+            return standby
+        except Exception as e:
+            self.logger.warning(f"[{tab.name}] Standby tab failed: {e}")
+            await self._close_tab_client(client)
+            return None
+    
+    async def reattach(self, port: int):
+        """Give every tab of a restarted browser a fresh Whisk page in it
+
+        The old pages died with the process, so their clients can never
+        reconnect. A tab that cannot be reopened is marked lost and its
+        worker stops taking prompts.
+        """
+        tabs = [tab for tab in self.tabs if tab.chrome_client.debug_port == port and not tab.lost]
+        if not tabs:
+            return
+        try:
+            # The restarted browser usually opened a Whisk page already
+            targets = await ChromeDevToolsClient(port).find_whisk_tabs(self.config.whisk_url_pattern)
+        except Exception as e:
+            self.logger.warning(f"Could not list tabs on port {port}: {e}")
+            targets = []
+        
+        for tab in tabs:
+            if tab.standby is not None:
+                tab.standby.cancel()
+                tab.standby = None
+            fresh = await self._open_standby(tab, targets.pop(0) if targets else None)
+            if fresh is None:
+                tab.lost = True
+                self.logger.error(f"[{tab.name}] Could not reopen Whisk after Chrome restarted on port {port}")
+                continue
+            await self._swap_tab(tab, fresh, recycled=False)
+            self.logger.info(f"🔁 [{tab.name}] Reattached to Chrome restarted on port {port}")
+    
+    async def _swap_tab(self, tab: WhiskTab, fresh: WhiskTab, recycled: bool = True):
+        """Move tab onto the fresh page in place, so workers holding it carry on, and close the old page"""
+        old_client = tab.chrome_client
+        description = self.watchdog.describe(tab.name)
+        tab.chrome_client = fresh.chrome_client
+        tab.react_handler = fresh.react_handler
+        tab.generation_monitor = fresh.generation_monitor
+        if old_client is self.chrome_client:
+            self.chrome_client = tab.chrome_client
+            self.react_handler = tab.react_handler
+        
+        await self._close_tab_client(old_client)
+        if recycled:
+            METRICS.inc("tab_recycles", outcome="ok")
+            self.logger.info(f"♻️ [{tab.name}] Recycled tab at {description}")
+    
+    async def _close_tab_client(self, client: ChromeDevToolsClient):
+        """Close the page behind client, then the connection"""
+        try:
+            if client.connected:
+                await client._send_command("Page.close", timeout=5)
+        except Exception as e:
+            self.logger.debug(f"Page.close failed: {e}")
+        await client.close()
+    
+    async def _run_sequential(self, items: AsyncIterator[Tuple[int, str]]) -> Dict[int, bool]:
+        """Process (offset, prompt) items one after another on the primary tab"""
+        results: Dict[int, bool] = {}
+        async for offset, prompt in items:
+            if self.tabs[0].lost:
+                raise ConnectionError("The Whisk tab was lost with its browser")
+            results[offset] = await self._execute(offset, prompt, self.tabs[0])
+        return results
+    
+    async def _run_pool(self, items: AsyncIterator[Tuple[int, str]]) -> Dict[int, bool]:
+        """Process (offset, prompt) items from a shared queue with one worker per tab"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=len(self.tabs) * 2)
+        results: Dict[int, bool] = {}
+        
+        async def producer():
+            async for item in items:
+                await queue.put(item)
+            for _ in self.tabs:
+                await queue.put(None)
+        
+        async def worker(tab: WhiskTab):
+            while not tab.lost:
+                item = await queue.get()
+                if item is None:
+                    return
+                
+                offset, prompt = item
+                results[offset] = await self._execute(offset, prompt, tab)
+            
+            self.logger.warning(f"[{tab.name}] Tab lost, its worker stops")
+            if all(tab.lost for tab in self.tabs):
+                raise ConnectionError("Every Whisk tab was lost with its browser")
+        
+        tasks = [asyncio.create_task(producer())] + [asyncio.create_task(worker(tab)) for tab in self.tabs]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # On an error, stop the siblings before the caller closes the tabs they use
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return dict(sorted(results.items()))
+    
+    async def _done_prefix(self, limit: int) -> int:
+        """Number of leading prompts (at most limit) the journal records as done for this exact text"""
+        done = 0
+        async for offset, prompt in self.prompt_source:
+            if done >= limit or offset != done or self.journal.status(offset, prompt) != 'done':
+                break
+            done += 1
+        return done
+    
+    async def _select_prompts(self) -> AsyncIterator[Tuple[int, str]]:
+        """Stream (offset, prompt) items, dropping those the run mode skips"""
+        mode = self.config.run_mode
+        start = self.journal.resume_offset(mode)
+        if start is None:
+            return
+        
+        # Only file sources can be re-read; generators and async iterables would be used up
+        seekable = isinstance(self.prompt_source, TextFilePromptSource)
+        if seekable and start and mode == RUN_RESUME:
+            # The journal may hold other batches' entries, so check each skipped prompt's hash
+            start = await self._done_prefix(start)
+        if seekable and start:
+            self.logger.info(f"Seeking to prompt {start + 1} ({mode})")
+            self.prompt_source.seek(start)
+        
+        skipped = 0
+        try:
+            async for offset, prompt in self.prompt_source:
+                if self.journal.should_process(offset, prompt, mode):
+                    yield offset, prompt
+                else:
+                    skipped += 1
+        finally:
+            if seekable:
+                self.prompt_source.seek(0)
+        
+        if skipped:
+            self.logger.info(f"Skipped {skipped} prompts already handled according to {self.journal.path} ({mode})")
+    
+    async def close(self):
+        """Close every tab connection and the journal file"""
+        clients = [tab.chrome_client for tab in self.tabs] or [self.chrome_client]
+        await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+        self.journal.close()
+        for tab in self.tabs:
+            if tab.standby is None:
+                continue
+            if not tab.standby.done():
+                tab.standby.cancel()
+            elif not tab.standby.cancelled() and tab.standby.result():
+                await self._close_tab_client(tab.standby.result().chrome_client)
+            tab.standby = None
+    
+    def can_reuse(self, config: WhiskConfig) -> bool:
+        """Whether a batch with config can run on this automator and its tabs"""
+        return all(getattr(config, name) == getattr(self.config, name)
+                   for name in (f.name for f in fields(WhiskConfig)) if name not in self.BATCH_SETTINGS)
+
+    async def ensure_ready(self) -> bool:
+        """Connect the tabs, unless a previous batch left them connected"""
+        if self.tabs and all(tab.chrome_client.connected for tab in self.tabs):
+            return True
+        
+        if self.tabs:
+            self.logger.info("Tab connection lost, reconnecting...")
+            await self.close()
+            self.tabs = []
+            self.chrome_client = ChromeDevToolsClient(self.config.debug_ports[0], self.config.command_timeout)
+        return await self.initialize()
+    
+    async def run_batch(self, prompts: Any = None) -> bool:
+        """Process a batch on the connected tabs and leave them connected
+
+        prompts replaces the automator's prompt source for this batch.
+        """
+        if prompts is not None:
+            self.prompt_source = open_prompt_source(prompts)
+        
+        source = self.prompt_source
+        if isinstance(source, TextFilePromptSource) and not source.path.exists():
+            self.logger.error(f"Prompts file not found: {source.path}")
+            return False
+        
+        total = source.count()
+        if total == 0:
+            self.logger.error("No prompts to process")
+            return False
+        self.logger.info(f"Starting automation for {total if total is not None else 'streamed'} prompts...")
+        
+        self.pacer = AdaptivePacer(
+            initial_gap=self.config.between_prompts_delay,
+            max_workers=len(self.tabs),
+            min_gap=self.config.min_prompt_gap,
+            max_gap=self.config.max_prompt_gap,
+            adaptive=self.config.adaptive_pacing,
+            logger=self.logger
+        )
+        for tab in self.tabs:
+            tab.processed = tab.successes = 0
+        renderer_before = await self._renderer_usage()
+        
+        items = self._select_prompts()
+        if len(self.tabs) > 1:
+            results = await self._run_pool(items)
+        else:
+            results = await self._run_sequential(items)
+        
+        if not results:
+            self.logger.info("Nothing left to process")
+            return True
+        
+        successful_prompts = sum(results.values())
+        self.pacer.log_rate("final")
+        for tab in self.tabs:
+            self.logger.info(f"[{tab.name}] {tab.successes}/{tab.processed} prompts succeeded")
+        await self._log_renderer_usage(renderer_before)
+        
+        success_rate = (successful_prompts / len(results)) * 100
+        self.logger.info(f"Automation completed. Success rate: {success_rate:.1f}% ({successful_prompts}/{len(results)})")
+        
+        return success_rate >= 50  # Consider successful if at least 50% of prompts processed
+    
+    async def _renderer_usage(self) -> List[Optional[Dict[str, float]]]:
+        """Performance.getMetrics of every tab, None where unavailable"""
+        async def usage(tab: WhiskTab):
+            try:
+                return await tab.chrome_client.performance_metrics()
+            except Exception as e:
+                self.logger.debug(f"[{tab.name}] Performance metrics unavailable: {e}")
+                return None
+        return await asyncio.gather(*(usage(tab) for tab in self.tabs))
+    
+    async def _log_renderer_usage(self, before: List[Optional[Dict[str, float]]]):
+        """Log renderer CPU time spent per tab during the batch, and what lean mode skipped
+
+        Comparing these lines between a run with --lean and one without shows the saving.
+        """
+        after = await self._renderer_usage()
+        for tab, start, end in zip(self.tabs, before, after):
+            if start and end:
+                spent = {name: max(0.0, end.get(name, 0) - start.get(name, 0))
+                         for name in ('TaskDuration', 'ScriptDuration', 'LayoutDuration', 'RecalcStyleDuration')}
+                per_prompt = spent['TaskDuration'] / tab.processed if tab.processed else 0
+                self.logger.info(
+                    f"[{tab.name}] Renderer CPU {spent['TaskDuration']:.1f}s ({per_prompt:.2f}s/prompt; "
+                    f"script {spent['ScriptDuration']:.1f}s, "
+                    f"layout+style {spent['LayoutDuration'] + spent['RecalcStyleDuration']:.1f}s)"
+                )
+            if tab.chrome_client.lean:
+                self.logger.info(f"[{tab.name}] {tab.chrome_client.lean.summary()}")
+    
     async def run(self) -> bool:
         """Run the automation process"""
+        exporter = MetricsExporter()
         try:
-            if not await self.initialize():
+            if self.config.metrics_port:
+                exporter.serve(self.config.metrics_port)
+            if self.config.metrics_file:
+                exporter.start_snapshots(self.config.metrics_file, self.config.metrics_interval)
+            if not await self.ensure_ready():
                 return False
             
-            prompts = self.load_prompts()
-            if not prompts:
-                return False
-            
-            self.logger.info(f"Starting automation for {len(prompts)} prompts...")
-            
-            successful_prompts = 0
-            for i, prompt in enumerate(prompts):
-                if await self.process_prompt(prompt, i):
-                    successful_prompts += 1
-                else:
-                    self.logger.warning(f"Skipping failed prompt {i + 1}")
-                
-                # Small delay between prompts
-                if i < len(prompts) - 1:
-                    await asyncio.sleep(2)
-            
-            success_rate = (successful_prompts / len(prompts)) * 100
-            self.logger.info(f"Automation completed. Success rate: {success_rate:.1f}% ({successful_prompts}/{len(prompts)})")
-            
-            return success_rate >= 50  # Consider successful if at least 50% of prompts processed
+            return await self.run_batch()
             
         except KeyboardInterrupt:
             self.logger.info("Automation interrupted by user")
@@ -295,50 +1227,179 @@ class WhiskAutomator:
             self.logger.error(f"Automation failed: {e}")
             return False
         finally:
-            await self.chrome_client.close()
+            await self.close()
+            await exporter.stop()
 
 
-def setup_logging(level: str = "INFO"):
-    """Setup logging configuration"""
-    logging.basicConfig(
-        level=getattr(logging, level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler('whisk_automation.log', encoding='utf-8')
-        ]
+class JsonLineFormatter(logging.Formatter):
+    """One JSON object per record, with the prompt/stage/duration extras when present"""
+
+    EXTRA_FIELDS = ('prompt_index', 'tab', 'stage', 'duration')
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name in self.EXTRA_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """Queues records with their arguments merged but their exception kept
+
+    The stock handler formats the record and drops exc_info, so the traceback
+    ended up inside the message and the JSON 'exception' field stayed empty.
+    Here each listener handler formats the exception in its own way.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        return record
+
+
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: str = "INFO", log_file: str = "whisk_automation.log",
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+    """Setup logging configuration
+
+    Records are handed to a background listener thread through a queue, so
+    console and disk writes never block the event loop. The log file holds
+    JSON lines and rotates by size. Calling this again only changes the level.
+    """
+    global _log_listener
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level.upper()))
+    if _log_listener is not None:
+        return
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    log_file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
     )
+    log_file_handler.setFormatter(JsonLineFormatter())
+
+    records = queue.SimpleQueue()
+    root.addHandler(RecordQueueHandler(records))
+    _log_listener = logging.handlers.QueueListener(records, console, log_file_handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+
+async def run_automation(config: WhiskConfig, browsers: int = 0) -> bool:
+    """Run the automator, first launching a pool of browsers if asked to
+
+    Naming account profiles launches one browser per profile even without browsers.
+    """
+    if not browsers and not config.chrome_profiles:
+        return await WhiskAutomator(config).run()
+    
+    pool = BrowserPool(browsers, base_port=config.chrome_debug_port, profiles=config.chrome_profiles,
+                       url=config.whisk_url)
+    if not await pool.start():
+        await pool.stop()
+        return False
+    try:
+        config = replace(config, chrome_debug_ports=pool.ports)
+        automator = WhiskAutomator(config)
+        pool.on_restart(automator.reattach)
+        return await automator.run()
+    finally:
+        # Leave the browsers open so the results stay visible
+        await pool.stop()
 
 
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description="Whisk Session Takeover Automation Tool")
-    parser.add_argument("--prompts", default="prompts.txt", help="Path to prompts file")
-    parser.add_argument("--delay", type=int, default=20, help="Generation delay in seconds")
+    parser.add_argument("--config", default="config.json", help="Settings file; command line options override it")
+    parser.add_argument("--prompts", default="prompts.txt", help="Path to prompts file (.txt, one per line, or .jsonl)")
+    parser.add_argument("--delay", type=int, default=20, help="Maximum seconds to wait for a generation to finish")
     parser.add_argument("--port", type=int, default=9222, help="Chrome debug port")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
     parser.add_argument("--retries", type=int, default=3, help="Number of retry attempts")
+    parser.add_argument("--workers", type=int, default=1, help="Number of Whisk tabs processing prompts in parallel")
+    parser.add_argument("--browsers", type=int, default=0,
+                        help="Launch this many Chrome instances (ports --port, --port+1, ...) and spread tabs across them")
+    parser.add_argument("--profile", action="append", dest="profiles", metavar="NAME",
+                        help="Persistent Chrome profile (one per account) for the next launched browser; repeatable")
+    parser.add_argument("--journal", default="whisk_journal.jsonl", help="Path to the prompt progress journal")
+    run_mode = parser.add_mutually_exclusive_group()
+    run_mode.add_argument("--resume", action="store_true", help="Skip prompts the journal records as done")
+    run_mode.add_argument("--retry-failed", action="store_true", help="Only replay prompts the journal records as failed")
+    parser.add_argument("--input-mode", choices=["react", "native"], default="react",
+                        help="How prompts are typed: synthetic React events or native Input.insertText")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--metrics-file", help="Write a JSON metrics snapshot to this file periodically")
+    parser.add_argument("--lean", action="store_true",
+                        help="Block analytics, fonts and media in the Whisk tabs and disable CSS animations")
+    parser.add_argument("--lean-block", help="Comma-separated resource classes to block in lean mode "
+                        "(analytics, fonts, media, images)")
+    parser.add_argument("--recycle-heap-mb", type=float,
+                        help="Replace a Whisk tab with a fresh one once its JS heap passes this size (0 = never)")
+    parser.add_argument("--recycle-nodes", type=int,
+                        help="Replace a Whisk tab with a fresh one once it holds this many DOM nodes (0 = never)")
+    parser.add_argument("--fixed-pacing", action="store_true",
+                        help="Keep the gap between prompts fixed instead of adapting it to observed latency")
+    
+    # Values from the config file become the defaults for the options above
+    config_args, _ = parser.parse_known_args()
+    file_config = WhiskConfig.from_file(config_args.config) if Path(config_args.config).exists() else WhiskConfig()
+    parser.set_defaults(
+        prompts=file_config.prompts_file,
+        delay=file_config.generation_delay,
+        port=file_config.chrome_debug_port,
+        retries=file_config.retry_attempts,
+        workers=file_config.workers,
+        journal=file_config.journal_file,
+        input_mode=file_config.input_mode
+    )
     
     args = parser.parse_args()
+    lean_block = [name.strip() for name in args.lean_block.split(",") if name.strip()] if args.lean_block else None
+    if lean_block and set(lean_block) - set(RESOURCE_CLASSES):
+        parser.error(f"--lean-block accepts: {', '.join(RESOURCE_CLASSES)}")
     
     # Setup logging
-    log_level = "DEBUG" if args.debug else "INFO"
+    log_level = "DEBUG" if args.debug else file_config.log_level
     setup_logging(log_level)
     
     # Create configuration
-    config = WhiskConfig(
+    config = replace(
+        file_config,
         chrome_debug_port=args.port,
         generation_delay=args.delay,
         retry_attempts=args.retries,
         prompts_file=args.prompts,
-        log_level=log_level
+        log_level=log_level,
+        workers=max(1, args.workers),
+        input_mode=args.input_mode,
+        journal_file=args.journal,
+        run_mode=RUN_RESUME if args.resume else RUN_RETRY_FAILED if args.retry_failed else file_config.run_mode,
+        adaptive_pacing=file_config.adaptive_pacing and not args.fixed_pacing,
+        metrics_port=args.metrics_port or file_config.metrics_port,
+        metrics_file=args.metrics_file or file_config.metrics_file,
+        chrome_profiles=args.profiles or file_config.chrome_profiles,
+        lean_mode=file_config.lean_mode or args.lean or bool(lean_block),
+        lean_block=lean_block or file_config.lean_block,
+        recycle_heap_mb=file_config.recycle_heap_mb if args.recycle_heap_mb is None else args.recycle_heap_mb,
+        recycle_dom_nodes=file_config.recycle_dom_nodes if args.recycle_nodes is None else args.recycle_nodes
     )
     
-    # Run automation
-    automator = WhiskAutomator(config)
-    
     try:
-        success = asyncio.run(automator.run())
+        success = asyncio.run(run_automation(config, args.browsers))
         sys.exit(0 if success else 1)
     except KeyboardInterrupt:
         print("\nAutomation interrupted by user")